@@ -0,0 +1,93 @@
+"""Cold-start benchmark for the Streamlit apps.
+
+Each run starts a fresh interpreter in a fresh copy of the tree, as a new
+container would: no .cache/, no published sounds, and data.json as checked
+in, so the app's own data is never touched. It then times importing
+streamlit plus the app's own modules, and the app's first full render
+through streamlit's AppTest, and lists which heavy modules were loaded by
+then. Medians over the runs are checked against the budgets.
+
+    python bench_startup.py [drumshed.py] [--runs 5]
+
+Results go to stdout and bench_output.txt. The exit status is 1 when a
+budget is exceeded.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# --- Constants ---
+IMPORT_BUDGET = 1.0  # seconds: streamlit + app modules
+RENDER_BUDGET = 2.5  # seconds: first AppTest run of the script
+APP_MODULES = ("datastore", "locker", "renditions", "metronome")
+HEAVY_MODULES = ("pandas", "numpy", "soundfile", "PIL")
+OUTPUT_FILE = "bench_output.txt"
+SKIP = shutil.ignore_patterns(".git", ".cache", "__pycache__", "drumshed.db*", "data.json.*",
+                              OUTPUT_FILE)
+
+# runs in the child interpreter; prints one JSON line
+CHILD = r"""
+import json, sys, time
+script, modules, heavy = sys.argv[1], sys.argv[2].split(","), sys.argv[3].split(",")
+loaded = lambda: [m for m in heavy if m in sys.modules]
+t = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+for name in modules:
+    __import__(name)
+imported = time.perf_counter() - t
+after_import = loaded()
+t = time.perf_counter()
+at = AppTest.from_file(script, default_timeout=60).run()
+rendered = time.perf_counter() - t
+print(json.dumps({"import": imported, "render": rendered, "after_import": after_import,
+                  "after_render": loaded(), "exceptions": len(at.exception)}))
+"""
+
+
+def run_once(script, root):
+    with tempfile.TemporaryDirectory() as tmp:
+        tree = os.path.join(tmp, "app")
+        shutil.copytree(root, tree, ignore=SKIP)
+        shutil.rmtree(os.path.join(tree, "static", "sounds"), ignore_errors=True)
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, os.path.join(tree, script),
+             ",".join(APP_MODULES), ",".join(HEAVY_MODULES)],
+            cwd=tree, capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("script", nargs="?", default="drumshed.py")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    runs = [run_once(args.script, root) for _ in range(args.runs)]
+    imported = statistics.median(r["import"] for r in runs)
+    rendered = statistics.median(r["render"] for r in runs)
+    last = runs[-1]
+    lines = [
+        f"{args.script}: {args.runs} cold starts",
+        f"  import       {imported:6.3f}s  (budget {IMPORT_BUDGET}s)  heavy: {', '.join(last['after_import']) or '-'}",
+        f"  first render {rendered:6.3f}s  (budget {RENDER_BUDGET}s)  heavy: {', '.join(last['after_render']) or '-'}",
+        f"  exceptions   {last['exceptions']}",
+    ]
+    over = imported > IMPORT_BUDGET or rendered > RENDER_BUDGET or last["exceptions"]
+    lines.append("  OVER BUDGET" if over else "  ok")
+    report = "\n".join(lines)
+    print(report)
+    with open(os.path.join(root, OUTPUT_FILE), "w") as f:
+        f.write(report + "\n")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
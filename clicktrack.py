@@ -0,0 +1,310 @@
+"""Offline click-track renderer.
+
+Renders a whole practice loop (tempo, feel, bars, accent pattern, sound)
+into one PCM buffer, for devices where live scheduling in the browser is
+unreliable and for downloading to practise offline.
+
+Mixing stays in numpy and never loops over clicks in Python: a
+(clicks x sample) grid of output positions is built by broadcasting, and
+np.bincount sums every scaled sample into the track in one pass. Positions
+wrap modulo the loop length, so a tail ringing past the last beat lands on
+the start and the file loops seamlessly.
+
+The same few settings get asked for over and over, so the encoded files
+sit in a two-tier LRU: up to DISK_BUDGET bytes under .cache/clicktracks/
+(loop_path()), and in front of it up to MEMORY_BUDGET bytes in memory,
+shared by every session in the process (loop_file()). Files over
+MEMORY_ITEM_BYTES never enter the memory tier and are read from disk each
+time they are asked for. Keys cover every rendering parameter plus the
+sound's content hash, so editing a sample never serves a stale loop.
+
+render_click_track() holds the whole grid and track at once, so it is
+for short loops. loop_path() goes through click_stream() instead, which
+yields fixed-size blocks computed on demand (memory stays at one block
+plus one sample's tail however long the track runs) and can be fed to
+write_stream() or, via wav_chunks(), straight into an HTTP response. Its
+loop mode wraps the tail onto the start exactly as mix() does. The only
+limit on a track, steady or ramped, is MAX_SECONDS of audio, which keeps
+one file well inside DISK_BUDGET.
+"""
+import hashlib
+import json
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import soundfile as sf
+
+from filehash import content_hash
+from rhythm import FEELS, SOUNDS_FOLDER
+from soundbank import RATE, processed_sound
+
+# --- Constants ---
+BEATS_PER_BAR = 4
+ACCENTS = {
+    "Downbeat": (1.0, 0.6, 0.6, 0.6),
+    "Backbeat": (0.6, 1.0, 0.6, 1.0),
+    "Even": (1.0, 1.0, 1.0, 1.0),
+}
+SUBDIVISION_GAIN = 0.5  # off-beat clicks, relative to their beat
+FORMATS = {"WAV": ("WAV", "PCM_16", "audio/wav"), "OGG": ("OGG", "VORBIS", "audio/ogg")}
+CACHE_FOLDER = os.path.join(".cache", "clicktracks")
+MEMORY_BUDGET = 64 * 1024 * 1024
+MEMORY_ITEM_BYTES = 8 * 1024 * 1024  # about 95 s of WAV
+DISK_BUDGET = 512 * 1024 * 1024
+BLOCK_FRAMES = RATE  # one second per streamed block
+MAX_SECONDS = 30 * 60  # about 160 MB as WAV
+
+# key -> encoded bytes, least recently used first
+_memory = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+
+
+def gains_at(clicks, subdivision, accents):
+    """Gain of each click index; accents are per beat and cycle."""
+    accents = np.asarray(accents, dtype=np.float32)
+    gains = accents[(clicks // subdivision) % len(accents)]
+    gains[clicks % subdivision != 0] *= SUBDIVISION_GAIN
+    return gains
+
+
+def click_gains(bars, subdivision, accents, beats_per_bar=BEATS_PER_BAR):
+    """Gain of every click in the track."""
+    return gains_at(np.arange(bars * beats_per_bar * subdivision), subdivision, accents)
+
+
+def mix(length, onsets, gains, sample):
+    """Circularly mix `sample` at each onset (in samples) into one buffer."""
+    positions = (onsets[:, None] + np.arange(len(sample))) % length
+    weights = gains[:, None] * sample
+    return np.bincount(positions.ravel(), weights.ravel(), minlength=length).astype(np.float32)
+
+
+def render_click_track(tempo, feel, bars, accents=ACCENTS["Downbeat"], sound="click.wav",
+                       beats_per_bar=BEATS_PER_BAR, sounds_folder=SOUNDS_FOLDER):
+    """Float32 mono samples at soundbank.RATE for `bars` bars of clicks."""
+    subdivision = FEELS[feel]
+    sample, rate = processed_sound(os.path.join(sounds_folder, sound))
+    interval = 60.0 * rate / (tempo * subdivision)  # samples, not rounded
+    clicks = bars * beats_per_bar * subdivision
+    length = int(round(clicks * interval))
+    # rounding each onset from the exact grid, so error never accumulates
+    onsets = np.round(np.arange(clicks) * interval).astype(np.int64)
+    gains = click_gains(bars, subdivision, accents, beats_per_bar)
+    track = mix(length, onsets, gains, sample)
+    return np.clip(track, -1.0, 1.0)
+
+
+def write_click_track(path, track, rate=RATE):
+    """Write to a file; the format follows the extension (.wav, .ogg)."""
+    fmt = os.path.splitext(path)[1].lstrip('.').upper()
+    file_format, subtype, _ = FORMATS[fmt]
+    sf.write(path, track, rate, format=file_format, subtype=subtype)
+
+
+# --- Streaming ---
+def _intervals(first, count, clicks, tempo, end_tempo, subdivision, rate):
+    """Samples from each click to the next; tempo moves linearly per click."""
+    i = np.arange(first, first + count)
+    bpm = tempo + (end_tempo - tempo) * i / max(clicks - 1, 1)
+    return 60.0 * rate / (bpm * subdivision)
+
+
+def stream_frames(tempo, feel, bars, end_tempo=None, sound="click.wav",
+                  beats_per_bar=BEATS_PER_BAR, sounds_folder=SOUNDS_FOLDER, batch=4096):
+    """Total length of click_stream() for these settings, in frames."""
+    subdivision = FEELS[feel]
+    sample, rate = processed_sound(os.path.join(sounds_folder, sound))
+    clicks = bars * beats_per_bar * subdivision
+    end_tempo = end_tempo or tempo
+    if not clicks:
+        return 0
+    total = 0.0
+    for first in range(0, clicks, batch):
+        count = min(batch, clicks - first)
+        iv = _intervals(first, count, clicks, tempo, end_tempo, subdivision, rate)
+        last_onset = total + iv[:-1].sum()
+        total += iv.sum()
+    return max(int(round(total)), int(round(last_onset)) + len(sample))
+
+
+def click_stream(tempo, feel, bars, accents=ACCENTS["Downbeat"], sound="click.wav",
+                 end_tempo=None, beats_per_bar=BEATS_PER_BAR, sounds_folder=SOUNDS_FOLDER,
+                 block=BLOCK_FRAMES, loop=False):
+    """Yield float32 blocks of `block` frames (the last one shorter).
+
+    With end_tempo the tempo ramps linearly from tempo to end_tempo over
+    the track. A click near the end of a block rings on into the next
+    through a carry buffer, so block edges are inaudible.
+
+    With loop (steady tempo only) the track is exactly `bars` long and
+    matches render_click_track(): onsets come straight off the grid and
+    the tail ringing past the end is mixed into the first block.
+    """
+    subdivision = FEELS[feel]
+    sample, rate = processed_sound(os.path.join(sounds_folder, sound))
+    clicks = bars * beats_per_bar * subdivision
+    end_tempo = end_tempo or tempo
+    interval = 60.0 * rate / (tempo * subdivision)
+    # most clicks that can start inside one block, at the fastest tempo
+    per_block = int(block * max(tempo, end_tempo) * subdivision / (60.0 * rate)) + 2
+    offsets = np.arange(len(sample))
+    if loop:
+        if end_tempo != tempo:
+            raise ValueError("only a steady tempo loops")
+        frames = int(round(clicks * interval))
+        # clicks whose sample runs past the end wrap onto the start
+        tail = np.arange(max(int((frames - len(sample)) / interval) - 1, 0), clicks)
+        wrapped = np.round(tail * interval).astype(np.int64)[:, None] + offsets
+        weights = gains_at(tail, subdivision, accents)[:, None] * sample
+        past = wrapped >= frames
+        carry = np.bincount((wrapped[past] - frames) % frames, weights[past],
+                            minlength=len(sample)).astype(np.float32)
+    else:
+        frames = stream_frames(tempo, feel, bars, end_tempo, sound, beats_per_bar, sounds_folder)
+        carry = np.zeros(len(sample), dtype=np.float32)
+    position = 0.0  # exact onset of click `done`, in frames
+    done = 0
+    for start in range(0, frames, block):
+        end = min(start + block, frames)
+        # once every click is placed, later blocks only drain the carry
+        count = max(min(per_block, clicks - done), 0)
+        iv = _intervals(done, count, clicks, tempo, end_tempo, subdivision, rate)
+        if loop:
+            onsets = np.arange(done, done + count) * interval
+        else:
+            onsets = position + np.concatenate(([0.0], np.cumsum(iv[:-1])))[:count]
+        rounded = np.round(onsets).astype(np.int64)
+        k = int(np.searchsorted(rounded, end))
+        width = end - start + len(sample)
+        positions = (rounded[:k, None] - start + offsets).ravel()
+        weights = (gains_at(np.arange(done, done + k), subdivision, accents)[:, None] * sample).ravel()
+        mixed = np.bincount(positions, weights, minlength=width).astype(np.float32)
+        mixed[:len(carry)] += carry
+        position += iv[:k].sum()
+        done += k
+        carry = mixed[end - start:]
+        yield np.clip(mixed[:end - start], -1.0, 1.0)
+
+
+def write_stream(path, blocks, rate=RATE):
+    """Write streamed blocks to a file; the format follows the extension."""
+    fmt = os.path.splitext(path)[1].lstrip('.').upper()
+    file_format, subtype, _ = FORMATS[fmt]
+    with sf.SoundFile(path, "w", rate, 1, subtype, format=file_format) as f:
+        for chunk in blocks:
+            f.write(chunk)
+
+
+def wav_chunks(blocks, frames, rate=RATE):
+    """16-bit WAV bytes for an HTTP body: the header up front (the length is
+    known from stream_frames), then each block as it is computed."""
+    size = frames * 2
+    yield struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + size, b"WAVE", b"fmt ", 16,
+                      1, 1, rate, rate * 2, 2, 16, b"data", size)
+    for chunk in blocks:
+        yield (chunk * 32767).astype("<i2").tobytes()
+
+
+# --- Loop Cache ---
+def loop_key(tempo, feel, bars, accents, sound, fmt, end_tempo=None,
+             beats_per_bar=BEATS_PER_BAR, sounds_folder=SOUNDS_FOLDER):
+    """Digest of everything that changes the rendered file."""
+    params = {
+        "tempo": tempo, "end_tempo": end_tempo, "feel": feel, "bars": bars, "beats_per_bar": beats_per_bar,
+        "accents": [float(a) for a in accents], "format": fmt, "rate": RATE,
+        "sound": content_hash(os.path.join(sounds_folder, sound)),
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+
+
+def _remember(key, data, budget=MEMORY_BUDGET, item_limit=MEMORY_ITEM_BYTES):
+    global _memory_bytes
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return
+        if len(data) > min(budget, item_limit):
+            return
+        _memory[key] = data
+        _memory_bytes += len(data)
+        while _memory_bytes > budget:
+            _, evicted = _memory.popitem(last=False)
+            _memory_bytes -= len(evicted)
+
+
+def _recall(key):
+    with _lock:
+        data = _memory.get(key)
+        if data is not None:
+            _memory.move_to_end(key)
+        return data
+
+
+def _prune_disk(cache_folder=CACHE_FOLDER, budget=DISK_BUDGET):
+    """Drop least recently used files until the folder fits the budget."""
+    entries = []
+    for entry in os.scandir(cache_folder):
+        if entry.is_file() and ".tmp" not in entry.name:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def track_seconds(tempo, bars, end_tempo=None, beats_per_bar=BEATS_PER_BAR):
+    """Length of a track in seconds (for a ramp, to within a click)."""
+    beats = bars * beats_per_bar
+    return float(_intervals(0, beats, beats, tempo, end_tempo or tempo, 1, 1.0).sum())
+
+
+def loop_path(tempo, feel, bars, accents=ACCENTS["Downbeat"], sound="click.wav", fmt="WAV",
+              end_tempo=None, cache_folder=CACHE_FOLDER):
+    """Path of the encoded loop in the disk tier, rendering it there if needed.
+
+    Renders are streamed to disk block by block, so memory stays flat
+    however long the track runs; a steady loop still wraps seamlessly.
+    Raises ValueError for tracks over MAX_SECONDS.
+    """
+    if end_tempo == tempo:
+        end_tempo = None
+    if track_seconds(tempo, bars, end_tempo) > MAX_SECONDS:
+        raise ValueError(f"Tracks are limited to {MAX_SECONDS // 60} minutes.")
+    key = loop_key(tempo, feel, bars, accents, sound, fmt, end_tempo)
+    path = os.path.join(cache_folder, f"{key}.{fmt.lower()}")
+    try:
+        os.utime(path)  # mtime doubles as last use for _prune_disk
+    except FileNotFoundError:
+        os.makedirs(cache_folder, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.{fmt.lower()}"
+        try:
+            write_stream(tmp, click_stream(tempo, feel, bars, accents, sound, end_tempo, loop=not end_tempo))
+            os.replace(tmp, path)
+        finally:
+            # _prune_disk() never counts temp files, so a failed render must not leave one
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        _prune_disk(cache_folder)
+    return path
+
+
+def loop_file(tempo, feel, bars, accents=ACCENTS["Downbeat"], sound="click.wav", fmt="WAV",
+              end_tempo=None, cache_folder=CACHE_FOLDER):
+    """Encoded loop bytes, from memory, else read from loop_path()."""
+    key = loop_key(tempo, feel, bars, accents, sound, fmt, None if end_tempo == tempo else end_tempo)
+    data = _recall(key)
+    if data is None:
+        with open(loop_path(tempo, feel, bars, accents, sound, fmt, end_tempo, cache_folder), "rb") as f:
+            data = f.read()
+        _remember(key, data)
+    return data
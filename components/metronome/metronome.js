@@ -0,0 +1,285 @@
+// Drumshed metronome engine.
+//
+// Lookahead scheduler ("a tale of two clocks"): a coarse timer wakes up every
+// LOOKAHEAD_MS and queues every click due within SCHEDULE_AHEAD seconds on the
+// AudioContext clock, which is sample accurate. JS timer jitter only moves
+// *when* clicks get queued, never when they sound. All sounds arrive as one
+// sprite (config.sprite = {url, sounds: {name: [offset, duration]}}) that is
+// fetched and decoded once; each click plays its sound's slice of it through
+// a fresh AudioBufferSourceNode, so switching sounds never downloads again.
+//
+// configure() can be called at any time; tempo and feel changes are picked
+// up at the next beat without stopping the clock.
+//
+// Trainer mode automates the tempo from inside the scheduler, so every step
+// lands exactly on a bar line: config.trainer = {step, every, target, play,
+// gap} adds `step` BPM every `every` bars until `target`, and with gap > 0
+// plays `play` bars then mutes `gap` bars (the beat display keeps counting).
+//
+// Every click belongs to a layer with its own sound and gain: "accent" on
+// each bar's downbeat, "beat" on the other beats, "sub" between beats and,
+// optionally, "poly" playing `against` evenly spaced clicks across every
+// `beats` beats (3:2, 4:3, 5:4). All of them are queued on the same audio
+// clock; a layer without a sound falls back to config.sound. Sounds are
+// names in the sprite.
+
+const LOOKAHEAD_MS = 25;
+const SCHEDULE_AHEAD = 0.1; // seconds
+const START_DELAY = 0.05; // seconds between start() and the first click
+const TAP_WINDOW = 8; // taps kept for the estimate
+const TAP_RESET_MS = 2000; // a pause this long starts a new tap run
+const TAP_TOLERANCE = 0.25; // intervals further than this from the median are dropped
+const TAP_RANGE = [30, 300]; // BPM
+
+// Timers on the page get throttled hard in background tabs and on mobile;
+// ticks from a worker keep coming, so prefer one when we can make it.
+function makeTicker(callback) {
+  try {
+    const source = `let id = null;
+      onmessage = (e) => {
+        clearInterval(id);
+        id = e.data ? setInterval(() => postMessage(0), e.data) : null;
+      };`;
+    const worker = new Worker(URL.createObjectURL(new Blob([source], { type: "text/javascript" })));
+    worker.onmessage = callback;
+    return {
+      start: (ms) => worker.postMessage(ms),
+      stop: () => worker.postMessage(0),
+    };
+  } catch (err) {
+    let id = null;
+    return {
+      start: (ms) => { clearInterval(id); id = setInterval(callback, ms); },
+      stop: () => { clearInterval(id); id = null; },
+    };
+  }
+}
+
+// Tap tempo from event timestamps (ms, high resolution). Uses the median
+// interval to throw out fumbled or doubled taps, then averages the rest.
+class TapTempo {
+  constructor() {
+    this.times = [];
+  }
+
+  // Returns the estimate in BPM once there are three taps, else null.
+  tap(ms) {
+    const last = this.times[this.times.length - 1];
+    if (last !== undefined && ms - last > TAP_RESET_MS) this.times = [];
+    this.times.push(ms);
+    if (this.times.length > TAP_WINDOW) this.times.shift();
+    if (this.times.length < 3) return null;
+    const intervals = this.times.slice(1).map((t, i) => t - this.times[i]);
+    const sorted = [...intervals].sort((a, b) => a - b);
+    const median = sorted[Math.floor(sorted.length / 2)];
+    const kept = intervals.filter((d) => Math.abs(d - median) <= median * TAP_TOLERANCE);
+    const mean = kept.reduce((a, b) => a + b, 0) / kept.length;
+    return Math.min(TAP_RANGE[1], Math.max(TAP_RANGE[0], 60000 / mean));
+  }
+}
+
+class DrumshedMetronome {
+  constructor() {
+    this.ctx = null;
+    this.buffers = new Map(); // url -> Promise<AudioBuffer>
+    this.config = {
+      bpm: 120, subdivision: 1, sound: null, sprite: null, gain: 1, beatsPerBar: 4, trainer: null,
+      layers: { accent: {}, beat: {}, sub: {}, poly: null },
+    };
+    this.pending = null; // config changes waiting for the next beat
+    this.running = false;
+    this.beat = 0; // beats scheduled since start()
+    this.click = 0; // click within the current beat
+    this.tempo = this.config.bpm; // live tempo; the trainer moves it off config.bpm
+    this.trainerBar = 0; // bar the trainer (re)started counting from
+    this.muted = false; // inside a trainer gap
+    this.tapped = null; // tapped tempo waiting for the next bar
+    this.nextTime = 0; // audio clock time of the next click
+    this.polyTimes = []; // queued poly clicks not yet handed to the audio clock
+    this.live = new Set(); // scheduled sources, so stop() can cancel them
+    this.onBeat = null; // ({beat, click, bar, bpm, muted, layer}) -> void, called as each click sounds
+    this.ticker = makeTicker(() => this.schedule());
+  }
+
+  ensureContext() {
+    if (!this.ctx) {
+      const AudioContext = window.AudioContext || window.webkitAudioContext;
+      this.ctx = new AudioContext({ latencyHint: "interactive" });
+      this.output = this.ctx.createGain();
+      this.output.connect(this.ctx.destination);
+    }
+    return this.ctx;
+  }
+
+  load(url) {
+    if (!this.buffers.has(url)) {
+      const ctx = this.ensureContext();
+      const buffer = fetch(url)
+        .then((response) => {
+          if (!response.ok) throw new Error(`${url}: ${response.status}`);
+          return response.arrayBuffer();
+        })
+        .then((data) => new Promise((resolve, reject) => ctx.decodeAudioData(data, resolve, reject)));
+      buffer.catch(() => this.buffers.delete(url));
+      this.buffers.set(url, buffer);
+    }
+    return this.buffers.get(url);
+  }
+
+  configure(changes) {
+    if (changes.sprite && this.ctx) this.load(changes.sprite.url);
+    if (this.running) {
+      this.pending = { ...this.pending, ...changes };
+    } else {
+      this.apply(changes);
+    }
+  }
+
+  // Settings are re-sent on every rerun; only a real tempo or trainer change
+  // restarts the trainer from config.bpm.
+  apply(changes) {
+    const retempo = ("bpm" in changes && changes.bpm !== this.config.bpm) ||
+      ("trainer" in changes && JSON.stringify(changes.trainer) !== JSON.stringify(this.config.trainer));
+    Object.assign(this.config, changes);
+    if (retempo) {
+      this.tempo = this.config.bpm;
+      this.trainerBar = this.bar();
+    }
+  }
+
+  // A tapped tempo replaces config.bpm; while running it lands on the next
+  // bar line (and restarts the trainer from there).
+  tapTempo(bpm) {
+    if (this.running) {
+      this.tapped = bpm;
+    } else {
+      this.config.bpm = bpm;
+      this.tempo = bpm;
+    }
+  }
+
+  bar() {
+    return Math.floor(this.beat / this.config.beatsPerBar);
+  }
+
+  // Called on the first click of every bar.
+  train() {
+    const trainer = this.config.trainer;
+    const bars = this.bar() - this.trainerBar;
+    this.muted = false;
+    if (!trainer) return;
+    if (bars > 0 && trainer.step && trainer.every && bars % trainer.every === 0) {
+      // Only step toward a target still ahead; one already passed (say a
+      // slider at 180 with the default target of 160) leaves the tempo be.
+      const next = this.tempo + trainer.step;
+      if (trainer.step > 0 && this.tempo < trainer.target) this.tempo = Math.min(next, trainer.target);
+      if (trainer.step < 0 && this.tempo > trainer.target) this.tempo = Math.max(next, trainer.target);
+    }
+    if (trainer.gap > 0) this.muted = bars % (trainer.play + trainer.gap) >= trainer.play;
+  }
+
+  async start() {
+    if (this.running) return;
+    const ctx = this.ensureContext();
+    // Must happen inside the user's click for mobile browsers to allow audio.
+    const resumed = ctx.resume();
+    if (this.config.sprite) await this.load(this.config.sprite.url);
+    await resumed;
+    this.running = true;
+    this.beat = 0;
+    this.click = 0;
+    this.tempo = this.config.bpm;
+    this.trainerBar = 0;
+    this.tapped = null;
+    this.polyTimes = [];
+    this.nextTime = ctx.currentTime + START_DELAY;
+    this.schedule();
+    this.ticker.start(LOOKAHEAD_MS);
+  }
+
+  stop() {
+    this.running = false;
+    this.ticker.stop();
+    for (const source of this.live) source.stop();
+    this.live.clear();
+    if (this.pending) {
+      this.apply(this.pending);
+      this.pending = null;
+    }
+  }
+
+  interval() {
+    return 60 / (this.tempo * this.config.subdivision);
+  }
+
+  schedule() {
+    if (!this.running) return;
+    const horizon = this.ctx.currentTime + SCHEDULE_AHEAD;
+    while (this.nextTime < horizon) {
+      if (this.click === 0) {
+        if (this.pending) {
+          this.apply(this.pending);
+          this.pending = null;
+        }
+        if (this.beat % this.config.beatsPerBar === 0) {
+          if (this.tapped) {
+            this.config.bpm = this.tempo = this.tapped;
+            this.trainerBar = this.bar();
+            this.tapped = null;
+          }
+          this.train();
+        }
+        const poly = this.config.layers.poly;
+        if (poly && this.beat % poly.beats === 0) {
+          const span = (poly.beats * 60) / this.tempo;
+          for (let i = 0; i < poly.against; i++) this.polyTimes.push(this.nextTime + (i * span) / poly.against);
+        }
+      }
+      let layer = "sub";
+      if (this.click === 0) layer = this.beat % this.config.beatsPerBar === 0 ? "accent" : "beat";
+      this.playAt(this.nextTime, {
+        beat: this.beat, click: this.click, bar: this.bar(), bpm: this.tempo, muted: this.muted, layer,
+      });
+      this.nextTime += this.interval();
+      this.click += 1;
+      if (this.click >= this.config.subdivision) {
+        this.click = 0;
+        this.beat += 1;
+      }
+    }
+    while (this.polyTimes.length && this.polyTimes[0] < horizon) {
+      const time = this.polyTimes.shift();
+      if (!this.muted && this.config.layers.poly) this.sound(time, this.config.layers.poly);
+    }
+  }
+
+  // Queue one click of a layer on the audio clock.
+  sound(time, layer) {
+    const sprite = this.config.sprite;
+    const span = sprite && sprite.sounds[layer.sound || this.config.sound];
+    const buffer = span && this.buffers.get(sprite.url);
+    if (!buffer) return;
+    const level = (layer.gain ?? 1) * this.config.gain;
+    buffer.then((decoded) => {
+      // A new sprite switched in mid-run may still be decoding; skip rather
+      // than play it late.
+      if (!this.running || time < this.ctx.currentTime) return;
+      const source = this.ctx.createBufferSource();
+      const gain = this.ctx.createGain();
+      gain.gain.value = level;
+      source.buffer = decoded;
+      source.connect(gain).connect(this.output);
+      source.onended = () => this.live.delete(source);
+      this.live.add(source);
+      source.start(time, span[0], span[1]);
+    });
+  }
+
+  playAt(time, state) {
+    if (!state.muted) this.sound(time, this.config.layers[state.layer] || {});
+    if (this.onBeat) {
+      const delay = Math.max(0, (time - this.ctx.currentTime) * 1000);
+      setTimeout(() => this.running && this.onBeat(state), delay);
+    }
+  }
+}
@@ -0,0 +1,389 @@
+"""Practice data store for drumshed.
+
+Streamlit reruns the whole app script on every interaction, so the app used
+to re-open and re-parse data.json several times per rerun. This module keeps
+one parsed copy per data file in memory (it lives in sys.modules, so it
+survives reruns and is shared by every session of the process) and only goes
+back to disk when the file's mtime/size changes or the internal version
+counter is bumped by a save or an explicit invalidate().
+
+Treat the dict returned by load_data() as the current state of the file:
+mutate it and hand it straight to save_data(), don't keep it around. Single
+record changes should go through append_record() / update_record() /
+delete_record() instead, which are cheap in journal mode.
+
+Every practice_log entry, goal and archive carries a persistent "id". The
+store keeps an id -> record index next to the cached data, so keyed updates
+and deletes never depend on list positions, which shift as soon as another
+session adds or removes something.
+
+Documents are versioned (see schema.py): a file from an older app
+generation goes through the migration pipeline once on load and is saved
+straight back, and records are completed and normalised as they are
+written, so everything in the cache has every field, an ID and canonical
+dates.
+
+Derived views (goalview.py) subscribe() to record changes made through
+this module so they can update in place instead of rebuilding.
+
+Storage modes (DRUMSHED_STORAGE environment variable):
+
+    json     every write rewrites data.json (default, and the only mode the
+             older app scripts understand)
+    journal  record changes are appended as one JSON line each to
+             data.json.journal and folded into data.json once the journal
+             passes JOURNAL_COMPACT_BYTES. Loading replays the journal on top
+             of the snapshot, so a crash costs at most the torn last line.
+    sqlite   everything lives in drumshed.db (see sqlstore.py); the path
+             arguments below are ignored in favour of sqlstore.DB_FILE.
+"""
+import contextlib
+import json
+import os
+import threading
+
+import sqlstore
+from schema import SCHEMA_VERSION, TABLES, complete_record, conform, migrate, new_id, normalize_record
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# --- Constants ---
+DATA_FILE = "data.json"
+STORAGE_MODE = os.environ.get("DRUMSHED_STORAGE", "json")
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+
+def empty_data():
+    return {"schema_version": SCHEMA_VERSION, **{table: [] for table in TABLES}}
+
+
+# --- In-memory cache ---
+# path -> {"key": cache key, "data": dict, "index": {table: {id: record}},
+#          "seq": last applied journal seq}
+_cache = {}
+_versions = {}
+_lock = threading.RLock()
+# journal files this thread holds the flock on: path -> open file
+_held = threading.local()
+# callables(path, op) run after each record change; op is the journal op,
+# or {"op": "reset"} after a whole-file save
+_listeners = []
+
+
+def _journal_path(path):
+    return f"{path}.journal"
+
+
+def _stat(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _cache_key(path):
+    key = (_stat(path), _versions.get(path, 0))
+    if STORAGE_MODE == "journal":
+        journal = _stat(_journal_path(path))
+        # an empty journal holds nothing a missing one doesn't (the first
+        # append creates it while the cache is still current)
+        key += (journal if journal and journal[1] else None,)
+    return key
+
+
+def invalidate(path=DATA_FILE):
+    """Force the next load_data() to re-read the file from disk."""
+    with _lock:
+        _versions[path] = _versions.get(path, 0) + 1
+
+
+# --- ID Index ---
+def _build_index(data):
+    return {table: {r["id"]: r for r in data[table]} for table in TABLES}
+
+
+def _remove(records, record):
+    # Identity match from the end: recent entries are the likeliest to go,
+    # and two records may well compare equal.
+    for i in range(len(records) - 1, -1, -1):
+        if records[i] is record:
+            del records[i]
+            return
+
+
+# --- Journal ---
+def _apply(data, index, op):
+    records = data.setdefault(op["table"], [])
+    by_id = index.setdefault(op["table"], {})
+    if op["op"] == "append":
+        records.append(op["record"])
+        by_id[op["record"]["id"]] = op["record"]
+    elif op["op"] == "update":
+        # Another session may already have deleted it; nothing to do then.
+        record = by_id.get(op["id"])
+        if record is not None:
+            record.update(op["changes"])
+    elif op["op"] == "delete":
+        record = by_id.pop(op["id"], None)
+        if record is not None:
+            _remove(records, record)
+
+
+def _replay_lines(f, data, index, seq, good_bytes):
+    """Apply the ops in f from its position; returns (good_bytes, seq, torn)."""
+    for line in f:
+        try:
+            op = json.loads(line)
+        except json.JSONDecodeError:
+            return good_bytes, seq, True
+        good_bytes += len(line)
+        if op["seq"] <= seq:
+            continue
+        _apply(data, index, op)
+        seq = op["seq"]
+    return good_bytes, seq, False
+
+
+def _replay(data, index, path):
+    """Apply journal entries newer than the snapshot; returns the last seq."""
+    seq = data.get("journal_seq", 0)
+    try:
+        f = open(_journal_path(path), "rb")
+    except FileNotFoundError:
+        return seq
+    with f:
+        good_bytes, seq, torn = _replay_lines(f, data, index, seq, 0)
+    if torn:
+        # A torn write from a crash, or another process's append still in
+        # flight (this read holds no lock). Look again under the lock: by
+        # then any writer has finished, so a line that still doesn't parse
+        # is torn. Everything before it is intact; cut it off so the next
+        # append starts on a clean line.
+        with _journal_lock(path), open(_journal_path(path), "rb") as f:
+            f.seek(good_bytes)
+            good_bytes, seq, torn = _replay_lines(f, data, index, seq, good_bytes)
+            if torn:
+                os.truncate(_journal_path(path), good_bytes)
+    return seq
+
+
+def _write_snapshot(data, path):
+    # Write to a temp file and swap it in so a crash mid-write never
+    # leaves a half-written data file behind.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=str, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@contextlib.contextmanager
+def _journal_lock(path):
+    """Serialise journal writers across processes (thread safety is _lock).
+
+    Re-entrant within a thread: a load_data() under the lock may migrate
+    and save, or cut off a torn line, and flock() on a second descriptor
+    of the same file would wait on ourselves forever. Nested callers get
+    the handle that is already locked.
+    """
+    held = _held.__dict__.setdefault("files", {})
+    if path in held:
+        yield held[path]
+        return
+    with open(_journal_path(path), "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        held[path] = f
+        try:
+            yield f
+        finally:
+            del held[path]
+
+
+def compact(path=DATA_FILE):
+    """Fold the journal into the snapshot and truncate it."""
+    with _lock, _journal_lock(path):
+        data = load_data(path)
+        data["journal_seq"] = _cache[path]["seq"]
+        _write_snapshot(data, path)
+        # Entries up to journal_seq are now in the snapshot, so a crash
+        # before the truncate only leaves lines that replay will skip.
+        os.truncate(_journal_path(path), 0)
+        _versions[path] = _versions.get(path, 0) + 1
+        _cache[path]["key"] = _cache_key(path)
+
+
+def _journal(op, path):
+    with _lock:
+        with _journal_lock(path) as f:
+            data = load_data(path)
+            op = dict(op, seq=_cache[path]["seq"] + 1)
+            line = json.dumps(op, default=str) + "\n"
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            _apply(data, _cache[path]["index"], json.loads(line))
+            _cache[path]["seq"] = op["seq"]
+            _cache[path]["key"] = _cache_key(path)
+            size = f.tell()
+        if size > JOURNAL_COMPACT_BYTES:
+            compact(path)
+
+
+def _save(data, path):
+    # Records here are already complete: keyed writes come through
+    # complete_record()/normalize_record(), loads through migrate().
+    with _lock:
+        if STORAGE_MODE == "journal":
+            cached = _cache.get(path)
+            data["journal_seq"] = cached["seq"] if cached else 0
+        _write_snapshot(data, path)
+        if STORAGE_MODE == "journal":
+            with _journal_lock(path):
+                os.truncate(_journal_path(path), 0)
+        _versions[path] = _versions.get(path, 0) + 1
+        _cache[path] = {
+            "key": _cache_key(path),
+            "data": data,
+            "index": _build_index(data),
+            "seq": data.get("journal_seq", 0),
+        }
+
+
+def _change(op, path):
+    if STORAGE_MODE == "journal":
+        _journal(op, path)
+        return
+    with _lock:
+        data = load_data(path)
+        # Round-trip through JSON so the cached copy matches what a fresh
+        # load of the file would give back.
+        _apply(data, _cache[path]["index"], json.loads(json.dumps(op, default=str)))
+        # no reset: the caller notifies the keyed op, so views update in place
+        _save(data, path)
+
+
+def _notify(op, path):
+    for listener in list(_listeners):
+        listener(path, op)
+
+
+# --- Public API ---
+def subscribe(listener):
+    """Call listener(path, op) after every record change and save_data()."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def read_json(path=DATA_FILE):
+    """Parse a data file (and replay its journal) without touching the cache."""
+    if _stat(path) is None:
+        return empty_data()
+    with open(path, "r") as f:
+        data = json.load(f)
+    migrate(data)
+    _replay(data, _build_index(data), path)
+    return data
+
+
+def load_data(path=DATA_FILE):
+    if STORAGE_MODE == "sqlite":
+        return sqlstore.load_data()
+    with _lock:
+        key = _cache_key(path)
+        cached = _cache.get(path)
+        if cached is not None and cached["key"] == key:
+            return cached["data"]
+
+        if _stat(path) is None:
+            data = empty_data()
+        else:
+            with open(path, "r") as f:
+                data = json.load(f)
+        # Files from older app generations are migrated once, for good.
+        upgraded = migrate(data)
+        index = _build_index(data)
+        seq = _replay(data, index, path) if STORAGE_MODE == "journal" else 0
+        _cache[path] = {"key": key, "data": data, "index": index, "seq": seq}
+        if upgraded:
+            _save(data, path)
+        return data
+
+
+def save_data(data, path=DATA_FILE):
+    """Rewrite the whole data file."""
+    # callers may hand in raw records, so the whole document is conformed
+    conform(data)
+    if STORAGE_MODE == "sqlite":
+        sqlstore.save_data(data)
+    else:
+        _save(data, path)
+    _notify({"op": "reset"}, path)
+
+
+def get_record(table, record_id, path=DATA_FILE):
+    if STORAGE_MODE == "sqlite":
+        return sqlstore.get_record(table, record_id)
+    with _lock:
+        load_data(path)
+        return _cache[path]["index"].get(table, {}).get(record_id)
+
+
+def append_record(table, record, path=DATA_FILE):
+    """Add a record and return its ID."""
+    record = {**complete_record(table, record), "id": record.get("id") or new_id()}
+    op = {"op": "append", "table": table, "record": record}
+    if STORAGE_MODE == "sqlite":
+        sqlstore.append_record(table, record)
+    else:
+        _change(op, path)
+    _notify(op, path)
+    return record["id"]
+
+
+def update_record(table, record_id, changes, path=DATA_FILE):
+    changes = normalize_record(table, changes)
+    op = {"op": "update", "table": table, "id": record_id, "changes": changes}
+    if STORAGE_MODE == "sqlite":
+        sqlstore.update_record(table, record_id, changes)
+    else:
+        _change(op, path)
+    _notify(op, path)
+
+
+def delete_record(table, record_id, path=DATA_FILE):
+    op = {"op": "delete", "table": table, "id": record_id}
+    if STORAGE_MODE == "sqlite":
+        sqlstore.delete_record(table, record_id)
+    else:
+        _change(op, path)
+    _notify(op, path)
+
+
+def count_records(table, path=DATA_FILE):
+    if STORAGE_MODE == "sqlite":
+        return sqlstore.count_records(table)
+    return len(load_data(path)[table])
+
+
+def notes_page(offset=0, limit=None, path=DATA_FILE):
+    """Newest-first slice of practice_log."""
+    if STORAGE_MODE == "sqlite":
+        return sqlstore.notes_page(offset, limit)
+    logs = load_data(path)["practice_log"]
+    stop = len(logs) - offset
+    start = 0 if limit is None else max(stop - limit, 0)
+    return logs[start:max(stop, 0)][::-1]
+
+
+def goals_by_target_date(path=DATA_FILE):
+    """Goals ordered by Target Date."""
+    if STORAGE_MODE == "sqlite":
+        return sqlstore.goals_by_target_date()
+    goals = load_data(path)["goals"]
+    return sorted(goals, key=lambda g: (g["Target Date"] is None, g["Target Date"] or ""))
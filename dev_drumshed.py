@@ -1,27 +1,19 @@
 import streamlit as st
-import threading
-import time
 import os
 import re
 from datetime import datetime
 import json
-import pandas as pd
-import numpy as np
-import soundfile as sf
-import io
+from metronome import FEELS, list_sounds, metronome
 
 # --- Constants ---
 DATA_FILE = "data.json"
-SOUNDS_FOLDER = "./sounds"
+SOUNDS_FOLDER = "sounds"
 
 # --- Initialize Session State Variables ---
 # These should be initialized once at startup
 for key, default in [
     ('is_running', False),
-    ('stop_metronome', False),
     ('current_beat', 0),
-    ('audio_trigger', False),
-    ('should_rerun', False),
     ('tempo', 120),
     ('feel', "1/4"),
 ]:
@@ -37,26 +29,12 @@ def load_data():
         return {"practice_log": [], "goals": [], "archives": []}
 
 def save_data(data):
+    # this script predates schema.py; dropping the version makes the data
+    # store migrate whatever gets written here on its next load
+    data.pop("schema_version", None)
     with open(DATA_FILE, "w") as f:
         json.dump(data, f, default=str, indent=2)
 
-# --- Generate Beep Sound ---
-def generate_beep():
-    t = np.linspace(0, 0.1, int(44100 * 0.1), False)
-    tone = np.sin(1000 * t * 2 * np.pi)
-    audio = (tone * 32767).astype(np.int16)
-    buf = io.BytesIO()
-    sf.write(buf, audio, 44100, format='WAV')
-    buf.seek(0)
-    return buf.read()
-
-beep_bytes = generate_beep()
-
-# --- Load Selected Sound ---
-def load_sound(path):
-    data, sr = sf.read(path, dtype='float32')
-    return data, sr
-
 # --- UI: Title and Settings ---
 # st.title("🎶Drumshed🎶")
 
@@ -64,62 +42,34 @@ def load_sound(path):
 st.image("images/logo.jpeg", use_container_width=True)
 st.subheader("Metronome")
 
-# --- Select Sound ---
-sounds_files = [f for f in os.listdir(SOUNDS_FOLDER) if os.path.isfile(os.path.join(SOUNDS_FOLDER, f))]
-selected_sound = st.selectbox("Select Click Sound", sounds_files)
-sound_path = os.path.join(SOUNDS_FOLDER, selected_sound)
-sound_array, sr = load_sound(sound_path)
-
-# --- Sliders and Selectboxes ---
-col1, col2 = st.columns([2, 1])
-with col1:
-    st.session_state['tempo'] = st.slider("Tempo (BPM)", 40, 200, st.session_state['tempo'])
-with col2:
-    st.session_state['feel'] = st.selectbox("Feel", ["1/4", "1/8", "Triplet", "1/16"], index=["1/4", "1/8", "Triplet", "1/16"].index(st.session_state['feel']))
+# --- Metronome ---
+# The browser owns the beat clock (components/metronome): the server only
+# sends tempo/feel/sound and hears back on Start/Stop, so a running
+# metronome costs no reruns. The panel is a fragment, so even those
+# events only rerun this part of the page.
+@st.fragment
+def metronome_panel():
+    # --- Select Sound ---
+    sounds_files = list_sounds(SOUNDS_FOLDER)
+    selected_sound = st.selectbox("Select Click Sound", sounds_files)
 
-# --- Start/Stop Button ---
-def start_stop():
-    if not st.session_state['is_running']:
-        st.session_state['is_running'] = True
-        st.session_state['stop_metronome'] = False
-        st.session_state['current_beat'] = 0
-        st.session_state['audio_trigger'] = False
-        start_metronome(st.session_state['tempo'])
-        st.rerun()
-    else:
-        st.session_state['stop_metronome'] = True
-        st.session_state['is_running'] = False
-        st.rerun()
-
-st.button("Start" if not st.session_state['is_running'] else "Stop", on_click=start_stop)
+    # --- Sliders and Selectboxes ---
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        st.session_state['tempo'] = st.slider("Tempo (BPM)", 40, 200, st.session_state['tempo'])
+    with col2:
+        st.session_state['feel'] = st.selectbox("Feel", list(FEELS), index=list(FEELS).index(st.session_state['feel']))
 
-# --- Background Metronome Thread ---
-def start_metronome(tempo):
-    def metronome():
-        interval = 60.0 / tempo
-        while not st.session_state['stop_metronome']:
-            # Signal main app to play sound
-            st.session_state['audio_trigger'] = True
-            st.session_state['current_beat'] += 1
-            # Set rerun flag
-            st.session_state['should_rerun'] = True
-            time.sleep(interval)
-    t = threading.Thread(target=metronome, daemon=True)
-    st.session_state['metronome_thread'] = t
-    t.start()
+    # --- Start/Stop lives in the component; it reports back as events ---
+    state = metronome(st.session_state['tempo'], st.session_state['feel'], selected_sound, events=True)
+    if state:
+        st.session_state['is_running'] = state['running']
+        st.session_state['current_beat'] = state['beats']
 
-# --- Check if rerun is needed ---
-if st.session_state.get('should_rerun', False):
-    st.session_state['should_rerun'] = False
-    st.rerun()
+    # --- Display current beat (live count is shown by the component) ---
+    st.write(f"Current Beat: {st.session_state.get('current_beat', 0)}")
 
-# --- Play beep when triggered ---
-if st.session_state.get('audio_trigger', False):
-    st.audio(beep_bytes, format='audio/wav')
-    st.session_state['audio_trigger'] = False
-
-# --- Display current beat ---
-st.write(f"Current Beat: {st.session_state.get('current_beat', 0)}")
+metronome_panel()
 
 
 import os
@@ -225,12 +175,6 @@ with st.expander("View Notes", expanded=True):
 # --- Goals & Progress ---
 st.subheader("Goals & Progress")
 data = load_data()
-goals_df = pd.DataFrame(data.get("goals", []))
-if not goals_df.empty:
-    goals_df['Target Date'] = pd.to_datetime(goals_df['Target Date'], errors='coerce')
-    goals_df = goals_df.sort_values(by='Target Date')
-archives_df = pd.DataFrame(data.get("archives", []))
-
 # --- Add a Goal ---
 with st.expander("Add Goal", expanded=False):
     with st.form("add_goal_form"):
@@ -253,6 +197,7 @@ with st.expander("Add Goal", expanded=False):
 
 # --- View Goals ---
 with st.expander("View Goals", expanded=True):
+    import pandas as pd  # deferred: heavy, and only the goal views use it
     data = load_data()
     goals_df = pd.DataFrame(data.get("goals", []))
     if not goals_df.empty:
@@ -310,6 +255,7 @@ with st.expander("View Goals", expanded=True):
 
 # --- Archived Goals ---
 with st.expander("Done Pile", expanded=False):
+    import pandas as pd
     data = load_data()
     archives_df = pd.DataFrame(data.get("archives", []))
     if not archives_df.empty:
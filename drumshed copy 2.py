@@ -20,6 +20,9 @@ def load_data():
         return {"practice_log": [], "goals": [], "archives": []}
 
 def save_data(data):
+    # this script predates schema.py; dropping the version makes the data
+    # store migrate whatever gets written here on its next load
+    data.pop("schema_version", None)
     with open(DATA_FILE, "w") as f:
         json.dump(data, f, default=str, indent=2)
 
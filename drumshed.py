@@ -1,151 +1,173 @@
 import streamlit as st
-import os
-import re
+import math
 from datetime import datetime
-import json
-import pandas as pd
 # import numpy as np
 # import soundfile as sf
 # import io
 
-# --- Constants ---
-DATA_FILE = "data.json"
-SOUNDS_FOLDER = "./sounds"
+# --- Practice Notes etc.. are parsed once and cached in the data store ---
+from datastore import (
+    load_data, get_record, append_record, update_record, delete_record,
+    count_records, notes_page,
+)
+# Goals come pre-parsed and pre-sorted from a view that follows each change
+from goalview import goal_view
+# Notes are searched through an inverted index kept up to date the same way
+from notesearch import search
 
+# --- Practice Locker folders are scanned once into a cached manifest ---
+from locker import load_manifest
+from renditions import get_image
 
-# Initialize session state variables
-if "is_running" not in st.session_state:
-    st.session_state['is_running'] = False
-
-# --- Load Data File For Practice Notes etc.. ---
-def load_data():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    else:
-        return {"practice_log": [], "goals": [], "archives": []}
+# --- Constants ---
+SOUNDS_FOLDER = "sounds"
+NOTES_PER_PAGE = 10
 
-def save_data(data):
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, default=str, indent=2)
 
+# Initialize session state variables
+if "notes_page" not in st.session_state:
+    st.session_state['notes_page'] = 0
 
-# Load sound file as base64
-import base64
 
+# The click runs in the browser; Python only sends settings and sound URLs
+from metronome import (
+    FEELS, LAYER_GAINS, POLYRHYTHMS, layer, list_sounds, metronome, poly_layer, trainer_settings,
+)
 
-# set default sound so no error when metronome hidden
-sound_folder = "./sounds"
-sound_files = [f for f in os.listdir(sound_folder) if f.endswith(('.wav', '.mp3', '.ogg'))]
-sound_path = os.path.join(sound_folder, 'click.wav')
-interval = 0.25
 
-with open(sound_path, "rb") as f:
-        sound_bytes = f.read()
-sound_base64 = base64.b64encode(sound_bytes).decode()
+sound_files = list_sounds(SOUNDS_FOLDER)
+default_sound = "click.wav" if "click.wav" in sound_files else sound_files[0]
 
 # --- UI: Title and Settings ---
 # st.title("🎶Drumshed🎶")
 # only logo full page
 st.image("images/logo.jpeg", use_container_width=True)
 
-show_metronome = st.checkbox("Show Metronome", value=False)
-
-if show_metronome:
+# Metronome widgets rerun as a fragment: moving Tempo or changing Feel only
+# reruns this panel, and the component hands the new settings to the click
+# that is already running instead of rebuilding the page around it.
+@st.fragment
+def metronome_panel():
     st.subheader("Metronome")
     st.caption('under construction -> better on desktop')
     # --- Initialize Sound folder / files 
     # sound_folder = "./sounds"
     # sound_files = [f for f in os.listdir(sound_folder) if f.endswith(('.wav', '.mp3', '.ogg'))]
     # --- Select Sound ---
-    selected_sound = st.selectbox("Click Sounds", sound_files)
-    sound_path = os.path.join(sound_folder, selected_sound)
-
-    with open(sound_path, "rb") as f:
-        sound_bytes = f.read()
-    sound_base64 = base64.b64encode(sound_bytes).decode()
+    # the click sound is picked inside the component, straight out of the
+    # sprite, so switching it never reruns anything
 
     # --- Sliders and Select Boxes
     col1, col2 = st.columns([3,1])
     with col1:
         st.slider("Tempo", 40, 200, 120, key="tempo")
     with col2:
-        feel_option = st.selectbox("Feel", ["1/4", "1/8", "Triplet", "1/16"], index=0, )
-        feel_map = {
-            "1/4": lambda bpm: 60.0 / bpm,
-            "1/8": lambda bpm: 60.0 / (bpm * 2),
-            "Triplet": lambda bpm: 60.0 / (bpm * 3),
-            "1/16": lambda bpm: 60.0 / (bpm * 4)
-        }
-    # --- calculated time interval ---
-    interval = feel_map[feel_option](st.session_state["tempo"])
-    # st.write(f"Interval: {interval:.2f} seconds.")
+        feel_option = st.selectbox("Feel", list(FEELS), index=0, )
+
+    # --- Tempo Trainer: the click itself steps the tempo, bar by bar ---
+    trainer = None
+    if st.checkbox("Tempo Trainer"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            step = st.number_input("+BPM", -20, 20, 5)
+        with col2:
+            every = st.number_input("Every (bars)", 1, 32, 4)
+        with col3:
+            target = st.number_input("Target BPM", 40, 240, 160)
+        col1, col2 = st.columns(2)
+        with col1:
+            play = st.number_input("Play (bars)", 1, 16, 2)
+        with col2:
+            gap = st.number_input("Gap (muted bars)", 0, 16, 0)
+        trainer = trainer_settings(step, every, target, play, gap)
+
+    # --- Layers: downbeat, beats, subdivisions and a polyrhythm, one clock ---
+    layers = {}
+    with st.expander("Layers"):
+        for name, label in (("accent", "Downbeat"), ("beat", "Beat"), ("sub", "Subdivision")):
+            col1, col2 = st.columns([2, 3])
+            with col1:
+                # None plays the main click sound
+                sound = st.selectbox(f"{label} Sound", [None, *sound_files], key=f"layer_{name}_sound",
+                                     format_func=lambda f: f or "Click Sound")
+            with col2:
+                gain = st.slider(f"{label} Volume", 0.0, 1.0, LAYER_GAINS[name], key=f"layer_{name}_gain")
+            layers[name] = layer(sound, gain)
+        ratio = st.radio("Polyrhythm", ["Off", *POLYRHYTHMS], horizontal=True)
+        if ratio != "Off":
+            col1, col2 = st.columns([2, 3])
+            with col1:
+                sound = st.selectbox("Poly Sound", [None, *sound_files], key="layer_poly_sound",
+                                     format_func=lambda f: f or "Click Sound")
+            with col2:
+                gain = st.slider("Poly Volume", 0.0, 1.0, LAYER_GAINS["poly"], key="layer_poly_gain")
+            layers["poly"] = poly_layer(ratio, sound, gain)
+
+    # Start / Stop is part of the component; tempo, feel and sound changes
+    # reach the running click at the next beat
+    metronome(st.session_state["tempo"], feel_option, default_sound, trainer, layers)
+
+    # --- Practice Loop: the same click rendered to an audio file ---
+    # (numpy/soundfile come in with clicktrack, so only once the panel shows)
+    from clicktrack import ACCENTS, FORMATS, loop_file, loop_path
+    with st.expander("Download Practice Loop"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            bars = st.number_input("Bars", 1, None, 8)
+        with col2:
+            accent = st.selectbox("Accents", list(ACCENTS))
+        with col3:
+            fmt = st.radio("Format", list(FORMATS), horizontal=True)
+        loop_sound = st.selectbox("Loop Sound", sound_files, index=sound_files.index(default_sound))
+        tempo = st.session_state["tempo"]
+        # a ramp speeds up (or slows down) steadily across the whole track
+        end_tempo = st.slider("Ramp To", 40, 200, tempo) if st.checkbox("Tempo Ramp") else tempo
+        if st.button("Render Loop"):
+            settings = (tempo, feel_option, bars, ACCENTS[accent], loop_sound, fmt, end_tempo)
+            try:
+                loop_path(*settings)  # rendered now, so the download starts at once
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                bpm = f"{tempo}-{end_tempo}" if end_tempo != tempo else f"{tempo}"
+                name = f"click-{bpm}bpm-{feel_option.replace('/', '_')}-{bars}bars.{fmt.lower()}"
+                st.session_state['practice_loop'] = (name, settings, FORMATS[fmt][2])
+        if "practice_loop" in st.session_state:
+            # the session keeps only the settings; the bytes are fetched from
+            # the shared cache when the button is clicked
+            name, settings, mime = st.session_state['practice_loop']
+            st.download_button(f"Download {name}", lambda: loop_file(*settings), file_name=name, mime=mime)
 
-    if st.button("Start / Stop", use_container_width=True):
-            st.session_state['is_running'] = not st.session_state['is_running']
+
+show_metronome = st.checkbox("Show Metronome", value=False)
+
+if show_metronome:
+    metronome_panel()
 
 
 # --- Practice Material Section ---
 st.subheader("Practice Locker")
 with st.expander("Show / Hide", expanded=True):
-    folder = "images"
-    if os.path.exists(folder):
-        # Get subfolders
-        subfolders = [sf for sf in os.listdir(folder) if os.path.isdir(os.path.join(folder, sf))]
-        
-        # Function to extract the prefix for sorting subfolders
-        def get_prefix(folder_name):
-            match = re.match(r'^([A-Za-z0-9]+)', folder_name)
-            return match.group(1) if match else folder_name
-
-        # Sort subfolders based on prefix
-        subfolders_sorted = sorted(subfolders, key=get_prefix)
-
-        if subfolders_sorted:
-            # Prepare display names without the prefix for subfolders
-            subfolder_display_map = {}
-            subfolder_display_names = []
-
-            for sf in subfolders_sorted:
-                # Remove prefix and underscore
-                name_without_prefix = re.sub(r'^[A-Za-z0-9]+_', '', sf)
-                subfolder_display_names.append(name_without_prefix)
-                subfolder_display_map[name_without_prefix] = sf
-
-            selected_subfolder_display = st.selectbox("Category", subfolder_display_names)
-            selected_subfolder = subfolder_display_map[selected_subfolder_display]
-            subfolder_path = os.path.join(folder, selected_subfolder)
-
-            # List files in selected subfolder
-            files = [f for f in os.listdir(subfolder_path) if os.path.isfile(os.path.join(subfolder_path, f))]
-
-            if files:
-                # Sort files based on prefix
-                def get_file_prefix(filename):
-                    match = re.match(r'^([A-Za-z0-9]+)', filename)
-                    return match.group(1) if match else filename
-
-                files_sorted = sorted(files, key=get_file_prefix)
-
-                # Create display names for files (remove prefix and extension)
-                file_display_map = {}
-                file_display_names = []
-
-                for f in files_sorted:
-                    name_without_prefix = re.sub(r'^[^_]*_', '', f)
-                    name_without_ext = re.sub(r'\.[^.]+$', '', name_without_prefix)
-                    file_display_names.append(name_without_ext)
-                    file_display_map[name_without_ext] = f
-
-                selected_file_display = st.selectbox("Exercise", file_display_names)
-                selected_file = file_display_map[selected_file_display]
-                file_path = os.path.join(subfolder_path, selected_file)
+    # folder scan, sorting and display names all come from the cached manifest
+    manifest = load_manifest()
+    if manifest is not None:
+        categories = manifest["categories"]
+        if categories:
+            selected_subfolder_display = st.selectbox("Category", list(categories))
+            exercises = categories[selected_subfolder_display]["exercises"]
+
+            if exercises:
+                selected_file_display = st.selectbox("Exercise", list(exercises))
+                exercise = exercises[selected_file_display]
+                selected_file = exercise["file"]
+                file_path = exercise["path"]
 
                 if selected_file.endswith('.pdf'):
                     st.write("PDF viewing is limited in Streamlit. Download below:")
                     st.markdown(f"[Download {selected_file}](/{file_path})")
                 elif selected_file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    st.image(file_path, use_container_width=True)
+                    image_size = st.radio("Image Size", ["Screen", "Phone", "Original"], horizontal=True, key="image_size")
+                    st.image(get_image(file_path, image_size.lower()), use_container_width=True)
                 else:
                     st.write("File type not supported for preview.")
             else:
@@ -162,37 +184,55 @@ st.subheader("Practice Log")
 with st.expander("Add Notes", expanded=False):
     diary = st.text_area("Notes on today's session")
     if st.button("Save Notes"):
-        data = load_data()
-        data["practice_log"].append({
-            "timestamp": str(datetime.now().replace(microsecond=0)),
+        append_record("practice_log", {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
             "entry": diary
         })
-        save_data(data)
 
 # strftime("%B %d, %Y %I:%M%p").lower()
 
 with st.expander("View Notes", expanded=False):
-    data = load_data()
-    logs = data.get("practice_log", [])
-    for idx, entry in reversed(list(enumerate(logs))):
+    query = st.text_input("Search Notes", placeholder="e.g. parad, jazz tune")
+
+    def show_note(entry):
         # with st.expander(f"Entry {idx+1} - {entry['timestamp']}", expanded=False):
         with st.expander(f"{entry['timestamp'][:10]} - - - - - - - {entry['entry'][:25]}", expanded=False):
             st.write(entry['entry'])
-            if st.button(f"Delete Entry {idx+1}", key=f"del_log_{idx}"):
-                logs.pop(idx)
-                data["practice_log"] = logs
-                save_data(data)
+            if st.button("Delete Entry", key=f"del_log_{entry['id']}"):
+                delete_record("practice_log", entry['id'])
                 st.rerun()
 
+    if query:
+        # best matches first, straight from the index
+        hits = search(query)
+        shown = f", showing the best {NOTES_PER_PAGE}" if len(hits) > NOTES_PER_PAGE else ""
+        matches = "1 matching entry" if len(hits) == 1 else f"{len(hits)} matching entries"
+        st.caption(f"{matches}{shown}" if hits else "No matching entries.")
+        for note_id in hits[:NOTES_PER_PAGE]:
+            show_note(get_record("practice_log", note_id))
+    else:
+        # only one page of entries is built per rerun
+        note_count = count_records("practice_log")
+        page_count = max(math.ceil(note_count / NOTES_PER_PAGE), 1)
+        st.session_state['notes_page'] = min(st.session_state['notes_page'], page_count - 1)
+        page = st.session_state['notes_page']
+
+        def turn_notes_page(step):
+            st.session_state['notes_page'] += step
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            st.button("◀ Newer", on_click=turn_notes_page, args=(-1,), disabled=page == 0, use_container_width=True)
+        with col2:
+            st.caption(f"Page {page + 1} of {page_count} - {note_count} entries")
+        with col3:
+            st.button("Older ▶", on_click=turn_notes_page, args=(1,), disabled=page >= page_count - 1, use_container_width=True)
+
+        for entry in notes_page(page * NOTES_PER_PAGE, NOTES_PER_PAGE):
+            show_note(entry)
+
 # --- Goals & Progress ---
 st.subheader("Goals & Progress")
-data = load_data()
-goals_df = pd.DataFrame(data.get("goals", []))
-if not goals_df.empty:
-    goals_df['Target Date'] = pd.to_datetime(goals_df['Target Date'], errors='coerce')
-    goals_df = goals_df.sort_values(by='Target Date')
-archives_df = pd.DataFrame(data.get("archives", []))
-
 # --- Add a Goal ---
 with st.expander("Add Goal", expanded=False):
     with st.form("add_goal_form"):
@@ -206,21 +246,19 @@ with st.expander("Add Goal", expanded=False):
                 "Target Date": str(target_date),
                 "Details": goal_details,
                 "Status": "New",
-                "Start Date": str(datetime.now().date())
+                "Start Date": datetime.now().date().isoformat()
             }
-            data["goals"].append(new_goal)
-            save_data(data)
+            append_record("goals", new_goal)
             st.success("Goal added!")
             st.rerun()
 
 # --- View Goals ---
 with st.expander("View Goals", expanded=False):
-    data = load_data()
-    goals_df = pd.DataFrame(data.get("goals", []))
-    if not goals_df.empty:
-        goals_df['Target Date'] = pd.to_datetime(goals_df['Target Date'], errors='coerce')
-        goals_df = goals_df.sort_values(by='Target Date')
-        for idx, row in goals_df.iterrows():
+    # rows come back already ordered by Target Date, dates already parsed
+    goals = goal_view()
+    if goals:
+        for goal in goals:
+            goal_id, row, due = goal['id'], goal['record'], goal['due']
             status_icons = {
                 "New": "🟣",
                 "In-the-works": "🟡🟠🟠",
@@ -232,7 +270,7 @@ with st.expander("View Goals", expanded=False):
                 "Forked": "🔴"
             }
             icon = status_icons.get(row['Status'], "⚪")
-            title = f"{icon}  -  **{row['Goal']}** - by - {row['Target Date'].date()} - currently: **{row['Status']}**"
+            title = f"{icon}  -  **{row['Goal']}** - by - {due} - currently: **{row['Status']}**"
             # title = f"**{row['Goal']}** - {row['Target Date'].date()} - **{row['Status']}** - {icon}"
             with st.expander(title, expanded=False):
                 st.write(f"**Details:** {row['Details']}")
@@ -242,11 +280,10 @@ with st.expander("View Goals", expanded=False):
                         "Update Status",
                         ["New", "In-the-works", "Dormant", "Demo-Ready", "Live-Ready", "Studio-Ready", "Forked"],
                         index=["New", "In-the-works", "Dormant", "Demo-Ready", "Live-Ready", "Studio-Ready", "Forked"].index(row['Status']),
-                        key=f"status_{idx}"
+                        key=f"status_{goal_id}"
                     )
                     if new_status != row['Status']:
-                        data["goals"][idx]["Status"] = new_status
-                        save_data(data)
+                        update_record("goals", goal_id, {"Status": new_status})
                         st.success(f"Status for '{row['Goal']}' updated.")
                         st.rerun()
                 with col2:
@@ -254,17 +291,15 @@ with st.expander("View Goals", expanded=False):
                         "Action",
                         ["Keep", "Success", "Delete"],
                         index=0,
-                        key=f"action_{idx}"
+                        key=f"action_{goal_id}"
                     )
                     if action == "Success":
-                        data["archives"].append({**row, "Status": "Forked"})
-                        data["goals"].pop(idx)
-                        save_data(data)
+                        append_record("archives", {**row, "Status": "Forked"})
+                        delete_record("goals", goal_id)
                         st.success(f"Goal '{row['Goal']}' archived.")
                         st.rerun()
                     elif action == "Delete":
-                        data["goals"].pop(idx)
-                        save_data(data)
+                        delete_record("goals", goal_id)
                         st.success(f"Goal '{row['Goal']}' deleted.")
                         st.rerun()
     else:
@@ -272,52 +307,15 @@ with st.expander("View Goals", expanded=False):
 
 # --- Archived Goals ---
 with st.expander("Done Pile", expanded=False):
-    data = load_data()
-    archives_df = pd.DataFrame(data.get("archives", []))
-    if not archives_df.empty:
-        for idx, row in archives_df.iterrows():
+    archives = load_data()["archives"]
+    if archives:
+        for row in list(archives):
             title = f"✅ {row['Goal']} - {row['Status']} - {row['Target Date']}"
             with st.expander(title, expanded=False):
                 st.write(f"**Details:** {row['Details']}")
-                if st.button(f"Delete from Archive", key=f"del_archive_{idx}"):
-                    data["archives"].pop(idx)
-                    save_data(data)
+                if st.button(f"Delete from Archive", key=f"del_archive_{row['id']}"):
+                    delete_record("archives", row['id'])
                     st.success(f"Archived goal '{row['Goal']}' permanently deleted.")
                     st.rerun()
     else:
         st.write("No archived goals.")
-
-## rendering javascript down here 
-# # JavaScript for playing sound
-js_code = f"""
-    <script>
-    var sound = new Audio("data:audio/wav;base64,{sound_base64}");
-    var interval = {interval * 1000}; // milliseconds
-    var timer;
-
-    function startMetronome() {{
-        if (!timer) {{
-            sound.currentTime = 0;
-            sound.play();
-            timer = setInterval(() => {{
-                sound.currentTime = 0;
-                sound.play();
-            }}, interval);
-        }}
-    }}
-
-    function stopMetronome() {{
-        clearInterval(timer);
-        timer = null;
-    }}
-
-    if ({str(st.session_state['is_running']).lower()}) {{
-        startMetronome();
-    }} else {{
-        stopMetronome();
-    }}
-    </script>
-"""
-
-# Render the JavaScript
-st.components.v1.html(js_code)
\ No newline at end of file
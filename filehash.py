@@ -0,0 +1,26 @@
+"""Content hashes of files on disk, memoised on their stat.
+
+Used wherever a cache key has to follow a file's content: the locker's
+renditions and the offline click tracks. The memo is keyed on
+(path, size, mtime_ns), so an unchanged file is read once per process and
+a file rewritten in place is hashed again.
+"""
+import hashlib
+import os
+
+# (path, size, mtime_ns) -> sha256 hex
+_hashes = {}
+
+
+def content_hash(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    digest = _hashes.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        _hashes[key] = digest
+    return digest
@@ -0,0 +1,122 @@
+"""Goals & Progress view model.
+
+The goals section used to build a DataFrame from the goals (and another
+from the archives) on every rerun, run pd.to_datetime and sort_values over
+it, and walk it with iterrows(). goal_view() instead keeps one list per
+data file of
+
+    {"id": goal id, "due": target date (datetime.date or None), "record": goal}
+
+already sorted by due date (undated goals last, ties in insertion order).
+"record" is the store's own record, so read it but change it through
+datastore. The list is built once, from datastore.goals_by_target_date()
+(the target_date index in sqlite mode). After that it follows
+append/update/delete through datastore.subscribe(): an added goal is
+bisected into place, a changed target date moves one row, and a status
+change needs nothing, since the row holds the record itself. A save_data(),
+or a reload after another process wrote the file, rebuilds the list.
+
+Rendering iterates these plain rows, so the page no longer needs pandas.
+"""
+import bisect
+import threading
+from datetime import date
+
+import datastore
+from schema import parse_date
+
+# --- View Cache ---
+# path -> {"source": data dict it was built from, "rows": [...], "keys": [...],
+#          "by_id": {id: row}, "next": insertion counter}
+_views = {}
+_lock = threading.RLock()
+
+
+def _row(record):
+    return {"id": record["id"], "due": parse_date(record["Target Date"]), "record": record}
+
+
+def _key(row, order):
+    due = row["due"]
+    return (due is None, due or date.max, order)
+
+
+def _insert(view, row):
+    key = _key(row, view["next"])
+    view["next"] += 1
+    at = bisect.bisect(view["keys"], key)
+    view["keys"].insert(at, key)
+    view["rows"].insert(at, row)
+    view["by_id"][row["id"]] = row
+
+
+def _discard(view, row_id):
+    row = view["by_id"].pop(row_id, None)
+    if row is None:
+        return
+    for i, candidate in enumerate(view["rows"]):
+        if candidate is row:
+            del view["rows"][i]
+            del view["keys"][i]
+            return
+
+
+def _build(data, ordered):
+    view = {"source": data, "rows": [], "keys": [], "by_id": {}, "next": 0}
+    # ordered may be a fresh query: map it back onto the cached records
+    records = {record["id"]: record for record in data["goals"]}
+    in_order = [records.pop(goal["id"]) for goal in ordered if goal["id"] in records]
+    rows = [_row(record) for record in in_order + list(records.values())]
+    # already in order, so this is one linear pass that settles the keys
+    keyed = sorted((_key(row, i), row) for i, row in enumerate(rows))
+    view["keys"] = [key for key, _ in keyed]
+    view["rows"] = [row for _, row in keyed]
+    view["by_id"] = {row["id"]: row for row in view["rows"]}
+    view["next"] = len(rows)
+    return view
+
+
+def _on_change(path, op):
+    if path not in _views or op["op"] == "reset":
+        _views.pop(path, None)
+        return
+    if op["table"] != "goals":
+        return
+    record = None
+    if op["op"] == "append":
+        # the view must hold the store's own record, not the op's copy
+        # (looked up before taking _lock: datastore may call in holding its own)
+        record = datastore.get_record("goals", op["record"]["id"], path)
+    with _lock:
+        view = _views.get(path)
+        if view is None:
+            return
+        if record is not None:
+            _insert(view, _row(record))
+        elif op["op"] == "update":
+            row = view["by_id"].get(op["id"])
+            if row is not None and "Target Date" in op["changes"]:
+                _discard(view, op["id"])
+                _insert(view, _row(row["record"]))
+        elif op["op"] == "delete":
+            _discard(view, op["id"])
+
+
+datastore.subscribe(_on_change)
+
+
+# --- Public API ---
+def goal_view(path=datastore.DATA_FILE):
+    """Goal rows ordered by due date (see module docstring)."""
+    data = datastore.load_data(path)
+    with _lock:
+        view = _views.get(path)
+        if view is not None and view["source"] is data:
+            return list(view["rows"])
+    # queried before taking _lock: datastore may call in holding its own
+    ordered = datastore.goals_by_target_date(path)
+    with _lock:
+        view = _views.get(path)
+        if view is None or view["source"] is not data:
+            view = _views[path] = _build(data, ordered)
+        return list(view["rows"])
@@ -0,0 +1,158 @@
+"""Batch import of new exercise scans into the Practice Locker.
+
+    python ingest.py SOURCE CATEGORY [--series A] [--workers N] [--dry-run]
+
+Takes every image in SOURCE, checks or assigns the locker's sort prefix
+(A001_, A002_, ...) and renders all sizes from renditions.py across a
+process pool, so nobody pays for the renditions on first browse. The scans
+are staged in a hidden folder under images/ (which the locker ignores) and
+only moved into images/CATEGORY once every one has rendered: a new category
+appears in one rename, an existing one gets the whole batch in a single
+quick pass of renames. The manifest is then updated in one atomic write.
+
+CATEGORY is an existing folder ("C_Snare Studio") or its display name
+("Snare Studio"); a new category needs its prefix spelled out ("J_Odd Meters").
+Files that already follow the locker convention (a letter and three digits,
+"B004_Paradiddle Builder.png") keep their prefix; everything else, scanner
+names like "IMG_0001.png" included, is numbered after the highest existing
+prefix in --series.
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import locker
+import renditions
+
+PREFIX_RE = re.compile(r'^[A-Z]\d{3}_')  # exercise files: B004_...
+CATEGORY_RE = re.compile(r'^[A-Z]_')  # category folders: C_Snare Studio
+
+
+def natural_key(name):
+    """'page 10' after 'page 9', the way a scanner names its output."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def resolve_category(root, category):
+    """Folder name for CATEGORY, matching display names of existing folders."""
+    if os.path.isdir(os.path.join(root, category)):
+        return category
+    for folder in os.listdir(root):
+        if locker.category_display_name(folder) == category and os.path.isdir(os.path.join(root, folder)):
+            return folder
+    if CATEGORY_RE.match(category):
+        return category
+    raise SystemExit(f"Unknown category '{category}'; give a new one a prefix, e.g. 'J_{category}'")
+
+
+def plan_names(sources, existing, series):
+    """Map each source file to its locker file name, validating prefixes.
+
+    existing is the list of file names already in the category.
+    """
+    taken_prefixes = {locker.get_prefix(f) for f in existing}
+    taken_names = {locker.exercise_display_name(f) for f in existing}
+    numbers = [
+        int(m.group(1)) for f in existing
+        if (m := re.match(rf'^{re.escape(series)}(\d+)_', f))
+    ]
+    next_number = max(numbers, default=0) + 1
+
+    plan = {}
+    errors = []
+    for src in sources:
+        filename = os.path.basename(src)
+        if PREFIX_RE.match(filename):
+            target = filename
+        else:
+            target = f"{series}{next_number:03d}_{filename}"
+            next_number += 1
+        prefix = locker.get_prefix(target)
+        name = locker.exercise_display_name(target)
+        if prefix in taken_prefixes:
+            errors.append(f"{filename}: prefix {prefix} is already used in this category")
+        if name in taken_names:
+            errors.append(f"{filename}: an exercise called '{name}' already exists")
+        taken_prefixes.add(prefix)
+        taken_names.add(name)
+        plan[src] = target
+    return plan, errors
+
+
+def ingest_one(src, staged):
+    """Worker: copy one scan into staging and render every size."""
+    shutil.copy2(src, staged)
+    digest = renditions.content_hash(staged)
+    renditions.make_all(staged, digest)
+    return staged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import exercise scans into the Practice Locker.")
+    parser.add_argument("source", help="folder of scans to import")
+    parser.add_argument("category", help="category folder or display name")
+    parser.add_argument("--series", default="A", type=str.upper,
+                        help="prefix letter for files without one (default A)")
+    parser.add_argument("--root", default=locker.IMAGES_FOLDER, help="locker folder (default images)")
+    parser.add_argument("--workers", type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument("--dry-run", action="store_true", help="show the plan, change nothing")
+    args = parser.parse_args(argv)
+    if not re.fullmatch(r'[A-Z]', args.series):
+        raise SystemExit(f"--series must be a single letter, not '{args.series}'")
+
+    sources = sorted(
+        (
+            os.path.join(args.source, f) for f in os.listdir(args.source)
+            if f.lower().endswith(locker.IMAGE_EXTENSIONS) and not f.startswith('.')
+        ),
+        key=lambda p: natural_key(os.path.basename(p)),
+    )
+    if not sources:
+        raise SystemExit(f"No images found in {args.source}")
+
+    folder = resolve_category(args.root, args.category)
+    folder_path = os.path.join(args.root, folder)
+    existing = os.listdir(folder_path) if os.path.isdir(folder_path) else []
+    plan, errors = plan_names(sources, existing, args.series)
+    if errors:
+        print("\n".join(errors), file=sys.stderr)
+        return 1
+
+    for src, target in plan.items():
+        print(f"{os.path.basename(src)} -> {folder}/{target}")
+    if args.dry_run:
+        return 0
+
+    # same filesystem as the locker, so moving the files in is a rename
+    staging = os.path.join(args.root, f".ingest-{os.getpid()}")
+    os.makedirs(staging)
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            futures = [
+                pool.submit(ingest_one, src, os.path.join(staging, target))
+                for src, target in plan.items()
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                staged = future.result()
+                print(f"[{done}/{len(futures)}] {os.path.basename(staged)}")
+        if os.path.isdir(folder_path):
+            for target in plan.values():
+                os.replace(os.path.join(staging, target), os.path.join(folder_path, target))
+        else:
+            os.rename(staging, folder_path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    # no digests in the manifest: renditions.content_hash() keys on the
+    # file's own size and mtime, so a scan overwritten in place is re-hashed
+    manifest = locker.build_manifest(args.root, previous=locker.read_manifest(args.root))
+    locker.write_manifest(manifest)
+    print(f"Imported {len(plan)} files into {folder}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
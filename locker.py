@@ -0,0 +1,175 @@
+"""Practice Locker manifest.
+
+The locker used to os.listdir images/ and the selected category on every
+rerun and re-sort/re-map the names each time. Here the whole library is
+described once as a manifest:
+
+    {"categories": {display name: {"folder": ..., "mtime": ...,
+                                   "exercises": {display name: {...}}}}}
+
+with each exercise carrying its file name, path, size and pixel dimensions.
+The manifest is cached process-wide and written to
+.cache/locker_manifest.json so a cold start doesn't rescan either (it lives
+outside images/ so writing it doesn't bump the mtimes it is checked
+against). It is only refreshed when a directory mtime changes (a file or
+category added, removed or renamed), and those stats are themselves checked
+at most every RECHECK_SECONDS.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+# --- Constants ---
+IMAGES_FOLDER = "images"
+CACHE_FOLDER = ".cache"
+MANIFEST_FILE = os.path.join(CACHE_FOLDER, "locker_manifest.json")
+RECHECK_SECONDS = 5
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+_cache = {}
+_lock = threading.Lock()
+
+
+# --- Names ---
+def get_prefix(name):
+    """Sort key prefix, e.g. 'A001' for 'A001_Checklist for Success.png'."""
+    match = re.match(r'^([A-Za-z0-9]+)', name)
+    return match.group(1) if match else name
+
+
+def category_display_name(folder):
+    return re.sub(r'^[A-Za-z0-9]+_', '', folder)
+
+
+def exercise_display_name(filename):
+    name_without_prefix = re.sub(r'^[^_]*_', '', filename)
+    return re.sub(r'\.[^.]+$', '', name_without_prefix)
+
+
+# --- Scanning ---
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _image_size(path):
+    # Pillow ships with Streamlit; Image.open only parses the header.
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except OSError:
+        return (None, None)
+
+
+def _scan_exercise(path, filename, previous=None):
+    stat = os.stat(path)
+    if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime_ns:
+        return previous
+    width, height = (None, None)
+    if filename.lower().endswith(IMAGE_EXTENSIONS):
+        width, height = _image_size(path)
+    return {
+        "file": filename,
+        "path": path,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "width": width,
+        "height": height,
+    }
+
+
+def _scan_category(root, folder, previous=None):
+    folder_path = os.path.join(root, folder)
+    mtime = _mtime(folder_path)
+    if previous and previous["mtime"] == mtime:
+        return previous
+    known = {}
+    if previous:
+        known = {ex["file"]: ex for ex in previous["exercises"].values()}
+    files = [
+        f for f in os.listdir(folder_path)
+        if not f.startswith('.') and os.path.isfile(os.path.join(folder_path, f))
+    ]
+    exercises = {}
+    for filename in sorted(files, key=lambda f: (get_prefix(f), f)):
+        path = os.path.join(folder_path, filename)
+        exercises[exercise_display_name(filename)] = _scan_exercise(path, filename, known.get(filename))
+    return {"folder": folder, "mtime": mtime, "exercises": exercises}
+
+
+def build_manifest(root=IMAGES_FOLDER, previous=None):
+    """Scan the library, reusing any category whose mtime hasn't moved."""
+    known = {}
+    if previous:
+        known = {c["folder"]: c for c in previous["categories"].values()}
+    folders = [
+        sf for sf in os.listdir(root)
+        if not sf.startswith('.') and os.path.isdir(os.path.join(root, sf))
+    ]
+    categories = {}
+    for folder in sorted(folders, key=lambda f: (get_prefix(f), f)):
+        categories[category_display_name(folder)] = _scan_category(root, folder, known.get(folder))
+    return {"root": root, "mtime": _mtime(root), "categories": categories}
+
+
+def _is_current(manifest, root):
+    if manifest["mtime"] != _mtime(root):
+        return False
+    return all(
+        category["mtime"] == _mtime(os.path.join(root, category["folder"]))
+        for category in manifest["categories"].values()
+    )
+
+
+def write_manifest(manifest, path=MANIFEST_FILE):
+    """Atomically replace the manifest file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def read_manifest(root=IMAGES_FOLDER, path=MANIFEST_FILE):
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return manifest if manifest.get("root") == root else None
+
+
+def load_manifest(root=IMAGES_FOLDER):
+    """The current manifest, or None when the images folder doesn't exist."""
+    with _lock:
+        cached = _cache.get(root)
+        now = time.monotonic()
+        if cached and now - cached["checked_at"] < RECHECK_SECONDS:
+            return cached["manifest"]
+        if not os.path.isdir(root):
+            _cache.pop(root, None)
+            return None
+
+        manifest = cached["manifest"] if cached else None
+        if manifest is None or not _is_current(manifest, root):
+            # The file may be newer than our copy, e.g. written by ingest.py.
+            manifest = read_manifest(root) or manifest
+        if manifest is None or not _is_current(manifest, root):
+            manifest = build_manifest(root, previous=manifest)
+            try:
+                write_manifest(manifest)
+            except OSError:
+                pass  # read-only deploy: the in-memory copy still works
+        _cache[root] = {"manifest": manifest, "checked_at": now}
+        return manifest
+
+
+def invalidate(root=IMAGES_FOLDER):
+    with _lock:
+        _cache.pop(root, None)
@@ -0,0 +1,152 @@
+"""Metronome component and its sound assets.
+
+The click itself runs in the browser: components/metronome holds a Web Audio
+lookahead scheduler (metronome.js) behind a small custom component, and
+metronome() below only sends it the settings. Because the component keeps
+its iframe across reruns, a tempo or feel change reaches the running engine
+as a new set of args instead of tearing the audio down.
+
+The metronome used to base64 the click sample into the component HTML on
+every rerun (~180 KB per interaction). Every sound is now run through
+soundbank.py and packed into one audio sprite, published once into
+Streamlit's static folder under a content-hashed name. The component only
+carries the sprite's URL and offset table, decodes the sprite once per
+session, and switches sounds by name with no further download. The sound
+picker is part of the component too, so a switch is not even a rerun; a
+rerun for anything else ships a few hundred bytes. Needs [server] enableStaticServing = true (see
+.streamlit/config.toml).
+
+`python metronome.py` builds and publishes the sprite ahead of time.
+"""
+import hashlib
+import os
+import threading
+
+import streamlit.components.v1 as components
+
+from rhythm import FEELS, SOUNDS_FOLDER
+
+# --- Constants ---
+STATIC_FOLDER = "static"
+PUBLISHED_FOLDER = os.path.join(STATIC_FOLDER, "sounds")
+STATIC_URL = "app/static"
+SOUND_EXTENSIONS = ('.wav', '.mp3', '.ogg')
+# poly clicks : beats they are spread across
+POLYRHYTHMS = {"3:2": (3, 2), "4:3": (4, 3), "5:4": (5, 4)}
+# default gain per layer when every layer plays the same sound
+LAYER_GAINS = {"accent": 1.0, "beat": 0.6, "sub": 0.3, "poly": 0.8}
+
+_component = components.declare_component(
+    "metronome",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "metronome"),
+)
+
+# ((name, size, mtime_ns), ...) of a sounds folder -> published sprite args
+_published = {}
+_lock = threading.Lock()
+
+
+def list_sounds(folder=SOUNDS_FOLDER):
+    return sorted(f for f in os.listdir(folder) if f.endswith(SOUND_EXTENSIONS))
+
+
+def publish(data, name, published_folder=PUBLISHED_FOLDER):
+    """Write bytes into the static folder under a content hash; returns its URL.
+
+    The URL is relative to the app root; the component resolves it from there.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(name)
+    dest = os.path.join(published_folder, f"{stem}-{digest}{ext}")
+    if not os.path.exists(dest):
+        os.makedirs(published_folder, exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, dest)
+    relative = os.path.relpath(dest, STATIC_FOLDER).replace(os.sep, "/")
+    return f"{STATIC_URL}/{relative}"
+
+
+def sprite_args(folder=SOUNDS_FOLDER):
+    """{"url", "sounds": {name: [offset, duration]}} for the folder's sprite,
+    built and published once per change to the folder."""
+    from soundbank import sprite, to_wav_bytes
+
+    paths = {name: os.path.join(folder, name) for name in list_sounds(folder)}
+    key = tuple((name, os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                for name, path in paths.items())
+    with _lock:
+        args = _published.get((folder, key))
+        if args is None:
+            samples, table = sprite(paths)
+            args = {"url": publish(to_wav_bytes(samples), "sprite.wav"),
+                    "sounds": {name: list(span) for name, span in table.items()}}
+            _published[(folder, key)] = args
+        return args
+
+
+def trainer_settings(step, every, target, play=0, gap=0):
+    """Trainer mode for metronome(): +step BPM every `every` bars up to
+    `target` (a negative step slows down to it); with gap > 0, `play` bars
+    of click then `gap` muted bars. Runs in the browser scheduler, so each
+    step lands on a bar line without a rerun."""
+    return {"step": step, "every": every, "target": target, "play": play, "gap": gap}
+
+
+def layer(sound=None, gain=None, name="beat"):
+    """One click layer for metronome(); sound=None plays the main sound."""
+    return {"sound": sound, "gain": LAYER_GAINS[name] if gain is None else gain}
+
+
+def poly_layer(ratio, sound=None, gain=None):
+    """A polyrhythm layer: ratio "3:2" plays 3 clicks across every 2 beats."""
+    against, beats = POLYRHYTHMS[ratio]
+    return {**layer(sound, gain, "poly"), "against": against, "beats": beats}
+
+
+def _layer_args(layers):
+    args = {"poly": None}
+    for name in ("accent", "beat", "sub", "poly"):
+        spec = layers.get(name) or (layer(name=name) if name != "poly" else None)
+        if spec:
+            args[name] = dict(spec)
+    return args
+
+
+def metronome(tempo, feel, sound, trainer=None, layers=None, events=False, report_every=0,
+              key="metronome"):
+    """Render the metronome (Start/Stop lives inside it, so audio starts from
+    a real click in the component, which mobile browsers insist on).
+
+    The browser owns the beat clock. `trainer` comes from trainer_settings()
+    and starts counting from `tempo`. `layers` maps "accent" (downbeat),
+    "beat", "sub" and "poly" to layer() / poly_layer() specs; missing ones
+    play the main sound at LAYER_GAINS, and there is no poly layer unless
+    given. Sounds are names in sounds/, played out of the sprite. The main
+    sound is chosen in the component's own picker; `sound` only sets it
+    initially, or again whenever a rerun passes a different one.
+
+    With events=True the component reports {"running", "beats", "bpm"}
+    (the live tempo) back on Start/Stop, and every report_every beats if
+    that is set; each report is one rerun, so keep it coarse. Returns the
+    last report, or None.
+    """
+    return _component(
+        bpm=tempo,
+        subdivision=FEELS[feel],
+        trainer=trainer,
+        sound=sound,
+        sprite=sprite_args(),
+        layers=_layer_args(layers or {}),
+        events=events,
+        report_every=report_every,
+        key=key,
+        default=None,
+    )
+
+
+if __name__ == "__main__":
+    # build step: process and publish the sprite before the first visitor
+    args = sprite_args()
+    print(f"{args['url']}: {len(args['sounds'])} sounds")
@@ -0,0 +1,147 @@
+"""Full-text search over the practice log.
+
+search() answers from an inverted index instead of scanning every entry
+per keystroke. Entries are split into lowercase word tokens, and each
+token maps to {note id: occurrences}. A sorted vocabulary turns a prefix
+("parad" for "paradiddle") into one bisect plus a short walk.
+
+Like goalview.py, the index is built once per data file. It then follows
+practice_log appends, edits and deletes through datastore.subscribe(), so
+a new note costs one entry's worth of tokens. A save_data(), or a reload
+after another process wrote the file, rebuilds it.
+
+Every query token (of PREFIX_MIN letters or more; shorter ones must match a
+whole word) must match some indexed token as a prefix. Notes are
+ranked by tf-idf over the tokens they matched (an exact word counts a
+little more than a prefix hit), then newest first.
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+import datastore
+
+# --- Constants ---
+TOKEN = re.compile(r"\w+")
+EXACT_BONUS = 1.5  # a whole-word match outweighs a prefix match
+PREFIX_MIN = 2  # shorter query words only match whole words
+
+# --- Index Cache ---
+# path -> {"source": data dict it was built from, "postings": {token: {id: count}},
+#          "vocab": sorted tokens, "docs": {id: Counter}, "stamps": {id: timestamp}}
+_indexes = {}
+_lock = threading.RLock()
+
+
+def tokenize(text):
+    return TOKEN.findall(str(text or "").lower())
+
+
+def _add(index, record):
+    tokens = Counter(tokenize(record["entry"]))
+    index["docs"][record["id"]] = tokens
+    index["stamps"][record["id"]] = record["timestamp"]
+    for token, count in tokens.items():
+        postings = index["postings"].get(token)
+        if postings is None:
+            postings = index["postings"][token] = {}
+            bisect.insort(index["vocab"], token)
+        postings[record["id"]] = count
+
+
+def _drop(index, note_id):
+    tokens = index["docs"].pop(note_id, None)
+    index["stamps"].pop(note_id, None)
+    for token in tokens or ():
+        postings = index["postings"][token]
+        postings.pop(note_id, None)
+        if not postings:
+            del index["postings"][token]
+            del index["vocab"][bisect.bisect_left(index["vocab"], token)]
+
+
+def _build(data):
+    index = {"source": data, "postings": {}, "vocab": [], "docs": {}, "stamps": {}}
+    for record in data["practice_log"]:
+        _add(index, record)
+    return index
+
+
+def _on_change(path, op):
+    if path not in _indexes or op["op"] == "reset":
+        _indexes.pop(path, None)
+        return
+    if op["table"] != "practice_log":
+        return
+    note_id = op["record"]["id"] if op["op"] == "append" else op["id"]
+    record = None
+    if op["op"] != "delete":
+        # looked up before taking _lock: datastore may call in holding its own
+        record = datastore.get_record("practice_log", note_id, path)
+    with _lock:
+        index = _indexes.get(path)
+        if index is None:
+            return
+        _drop(index, note_id)
+        if record is not None:
+            _add(index, record)
+
+
+datastore.subscribe(_on_change)
+
+
+def _index(path):
+    data = datastore.load_data(path)
+    with _lock:
+        index = _indexes.get(path)
+        if index is None or index["source"] is not data:
+            index = _indexes[path] = _build(data)
+        return index
+
+
+def _expand(index, prefix):
+    """Indexed tokens starting with prefix."""
+    if len(prefix) < PREFIX_MIN:
+        yield from ([prefix] if prefix in index["postings"] else [])
+        return
+    vocab = index["vocab"]
+    i = bisect.bisect_left(vocab, prefix)
+    while i < len(vocab) and vocab[i].startswith(prefix):
+        yield vocab[i]
+        i += 1
+
+
+# --- Public API ---
+def search(query, limit=None, path=datastore.DATA_FILE):
+    """IDs of the notes matching every word of query (as a prefix), best first."""
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+    index = _index(path)
+    with _lock:
+        total = max(len(index["docs"]), 1)
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for token in _expand(index, term):
+                postings = index["postings"][token]
+                weight = math.log(1 + total / len(postings)) * (EXACT_BONUS if token == term else 1.0)
+                for note_id, count in postings.items():
+                    term_scores[note_id] = term_scores.get(note_id, 0.0) + weight * (1 + math.log(count))
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {note_id: score + term_scores[note_id]
+                          for note_id, score in scores.items() if note_id in term_scores}
+            if not scores:
+                return []
+        # canonical ISO timestamps (schema.py) sort as strings, so equal
+        # scores fall back to newest first
+        stamps = index["stamps"]
+        key = lambda note_id: (scores[note_id], stamps[note_id])
+        if limit is not None:
+            return heapq.nlargest(limit, scores, key=key)
+        return sorted(scores, key=key, reverse=True)
@@ -0,0 +1,64 @@
+"""Display-size derivatives of the Practice Locker scans.
+
+images/ holds full-resolution scans (some well over a megabyte) and the
+locker used to send the original on every selection. make_rendition()
+produces a width-capped WebP per size in RENDITIONS and caches it under
+.cache/renditions/, keyed by the source's content hash so an edited scan
+never serves a stale derivative and a renamed one reuses its old files.
+The originals stay where they are and are served when asked for.
+"""
+import os
+
+from filehash import content_hash
+
+# --- Constants ---
+CACHE_FOLDER = os.path.join(".cache", "renditions")
+RENDITIONS = {"screen": 1600, "phone": 800, "thumb": 240}
+FORMAT = "WEBP"
+EXTENSION = ".webp"
+QUALITY = 80
+
+def rendition_path(digest, size, cache_folder=CACHE_FOLDER):
+    return os.path.join(cache_folder, f"{digest[:20]}-{size}{EXTENSION}")
+
+
+def _render(src, dest, width):
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        img.thumbnail((width, img.height), Image.LANCZOS)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.{id(img)}.tmp"
+        img.save(tmp, FORMAT, quality=QUALITY, method=4)
+    os.replace(tmp, dest)
+
+
+def make_rendition(src, size, digest=None, cache_folder=CACHE_FOLDER):
+    """Path of the cached `size` derivative of src, rendering it if needed."""
+    digest = digest or content_hash(src)
+    dest = rendition_path(digest, size, cache_folder)
+    if not os.path.exists(dest):
+        _render(src, dest, RENDITIONS[size])
+    return dest
+
+
+def make_all(src, digest=None, cache_folder=CACHE_FOLDER):
+    digest = digest or content_hash(src)
+    return {size: make_rendition(src, size, digest, cache_folder) for size in RENDITIONS}
+
+
+def get_image(src, size, digest=None):
+    """What the locker should display: a derivative, or the original.
+
+    Falls back to the original for size "original" and for anything Pillow
+    can't convert, so a bad scan still shows up.
+    """
+    if size not in RENDITIONS:
+        return src
+    try:
+        return make_rendition(src, size, digest)
+    except (OSError, ValueError):
+        return src
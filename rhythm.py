@@ -0,0 +1,9 @@
+"""Metronome settings shared by the live component and the offline renderer.
+
+Kept free of Streamlit and numpy so either side can import it cheaply.
+"""
+
+# --- Constants ---
+SOUNDS_FOLDER = "sounds"
+# clicks per beat for each Feel
+FEELS = {"1/4": 1, "1/8": 2, "Triplet": 3, "1/16": 4}
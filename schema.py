@@ -0,0 +1,152 @@
+"""Canonical shapes for dates and timestamps in the practice data.
+
+data.json grew up with whatever str(datetime) happened to produce:
+"2025-07-26 11:21:25.933992", "2025-07-30 18:55:24", "2025-08-08 00:00:00"
+and "2024-05-15" all sit side by side, so every reader had to coerce them
+(pd.to_datetime, entry['timestamp'][:10]). datastore now runs records
+through normalize_record() on the way in, and rewrites older files once
+when it loads them, so what is stored is always
+
+    practice_log.timestamp            "YYYY-MM-DDTHH:MM:SS"  (ISO 8601, local)
+    goals/archives Target/Start Date  "YYYY-MM-DD"
+
+Both compare, sort and range-filter correctly as plain strings, and
+parse_date() is a single fromisoformat(). Values that don't parse are
+kept as they are rather than thrown away.
+
+Documents carry a "schema_version". migrate() brings an older document
+(no version means 0) up to SCHEMA_VERSION by running each step in
+MIGRATIONS once; datastore saves the result, so later loads skip the
+pipeline entirely. After it, every record has every field in FIELDS, an
+"id", and canonical dates, so readers index fields directly instead of
+.get()-ing and coercing row by row.
+"""
+import uuid
+from datetime import date, datetime
+
+# --- Constants ---
+TABLES = ("practice_log", "goals", "archives")
+# every field each record has after migration, with the value to fill in
+FIELDS = {
+    "practice_log": {"timestamp": "", "entry": ""},
+    "goals": {"Goal": "", "Target Date": None, "Details": "", "Status": "New", "Start Date": None},
+    "archives": {"Goal": "", "Target Date": None, "Details": "", "Status": "Forked", "Start Date": None},
+}
+TIMESTAMP_FIELDS = {"practice_log": ("timestamp",)}
+DATE_FIELDS = {"goals": ("Target Date", "Start Date"), "archives": ("Target Date", "Start Date")}
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    try:
+        return datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+
+
+def canonical_timestamp(value):
+    parsed = _to_datetime(value) if value not in (None, "") else None
+    return parsed.isoformat(timespec="seconds") if parsed else value
+
+
+def canonical_date(value):
+    parsed = _to_datetime(value) if value not in (None, "") else None
+    return parsed.date().isoformat() if parsed else value
+
+
+def parse_date(value):
+    """datetime.date from a stored date, None if it isn't one."""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_record(table, changes):
+    """Copy of a record (or a partial update) with canonical date fields."""
+    changes = dict(changes)
+    for field in TIMESTAMP_FIELDS.get(table, ()):
+        if field in changes:
+            changes[field] = canonical_timestamp(changes[field])
+    for field in DATE_FIELDS.get(table, ()):
+        if field in changes:
+            changes[field] = canonical_date(changes[field])
+    return changes
+
+
+def normalize_data(data):
+    """Rewrite every date field of a whole document in place; returns True
+    if anything changed (so the caller knows to save it back once)."""
+    changed = False
+    for table in set(TIMESTAMP_FIELDS) | set(DATE_FIELDS):
+        for record in data.get(table, []):
+            canonical = normalize_record(table, record)
+            if canonical != record:
+                record.update(canonical)
+                changed = True
+    return changed
+
+
+def new_id():
+    return uuid.uuid4().hex[:12]
+
+
+def complete_record(table, record):
+    """A new record as it should be stored: every field, canonical dates."""
+    return normalize_record(table, {**FIELDS[table], **record})
+
+
+# --- Migrations ---
+def _fill_fields(data):
+    for table in TABLES:
+        records = data.setdefault(table, [])
+        for i, record in enumerate(records):
+            if FIELDS[table].keys() - record.keys():
+                records[i] = {**FIELDS[table], **record}
+
+
+def _assign_ids(data):
+    for table in TABLES:
+        for record in data[table]:
+            if not record.get("id"):
+                record["id"] = new_id()
+
+
+def _blank_timestamps(data):
+    for record in data["practice_log"]:
+        if record["timestamp"] is None:
+            record["timestamp"] = ""
+
+
+# schema_version a document reaches -> step that takes it there (in place)
+MIGRATIONS = {
+    1: _fill_fields,  # all tables present, all fields on every record
+    2: _assign_ids,  # stable record IDs
+    3: normalize_data,  # canonical dates and timestamps
+    4: _blank_timestamps,  # a log entry's timestamp is always a string
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+
+def migrate(data):
+    """Run the steps a document is missing; returns True if it changed."""
+    version = data.get("schema_version", 0)
+    if version >= SCHEMA_VERSION:
+        return False
+    for target in range(version + 1, SCHEMA_VERSION + 1):
+        MIGRATIONS[target](data)
+    data["schema_version"] = SCHEMA_VERSION
+    return True
+
+
+def conform(data):
+    """Re-run every step on a whole document about to be written, whatever
+    version it claims: callers may have added raw records to it."""
+    for target in range(1, SCHEMA_VERSION + 1):
+        MIGRATIONS[target](data)
+    data["schema_version"] = SCHEMA_VERSION
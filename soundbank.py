@@ -0,0 +1,115 @@
+"""Sound bank: click samples cleaned up once at load time.
+
+The files in sounds/ come in different rates (44.1/48 kHz), channel counts
+and bit depths, and most of each file is silence: click.wav is 464 ms of
+24-bit stereo for a ~130 ms transient. prepare() turns every sample into
+the same shape:
+
+    - mono, RATE Hz, 16-bit when written out
+    - leading silence cut right up to the onset, so every sound starts
+      sounding at sample 0 and onset latency is the same for all of them
+    - trailing silence cut after the tail, ending on a short fade
+    - peak-normalised to PEAK_DBFS
+
+Processed buffers are cached per (path, size, mtime), so each file is
+decoded and processed once per process.
+
+sprite() packs every processed sound into one buffer, each padded with
+SPRITE_GAP of silence, plus a table of name -> (offset, duration) in
+seconds, so a browser can download and decode the whole bank once and
+play any sound out of it by offset.
+"""
+import io
+import os
+import threading
+
+import numpy as np
+import soundfile as sf
+
+# --- Constants ---
+RATE = 44100
+SUBTYPE = 'PCM_16'
+SILENCE_DB = -50  # relative to the sample's own peak
+PEAK_DBFS = -1.0
+FADE_MS = 5
+SPRITE_GAP = 0.05  # seconds of silence after each sound in a sprite
+
+_cache = {}
+_lock = threading.Lock()
+
+
+# --- Load Selected Sound ---
+def load_sound(path):
+    data, sr = sf.read(path, dtype='float32')
+    return data, sr
+
+
+def to_mono(data):
+    return data.mean(axis=1) if data.ndim > 1 else data
+
+
+def resample(data, sr, rate=RATE):
+    """Linear-interpolation resample; plenty for percussive clicks."""
+    if sr == rate or len(data) == 0:
+        return data
+    n = int(round(len(data) * rate / sr))
+    positions = np.arange(n) * (sr / rate)
+    return np.interp(positions, np.arange(len(data)), data).astype(np.float32)
+
+
+def trim_silence(data, rate=RATE, silence_db=SILENCE_DB, fade_ms=FADE_MS):
+    peak = np.abs(data).max(initial=0.0)
+    if peak == 0:
+        return data[:0]
+    loud = np.flatnonzero(np.abs(data) > peak * 10 ** (silence_db / 20))
+    trimmed = data[loud[0]:loud[-1] + 1].copy()
+    fade = min(len(trimmed), int(rate * fade_ms / 1000))
+    if fade:
+        trimmed[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)
+    return trimmed
+
+
+def normalize(data, peak_dbfs=PEAK_DBFS):
+    peak = np.abs(data).max(initial=0.0)
+    if peak == 0:
+        return data
+    return (data * (10 ** (peak_dbfs / 20) / peak)).astype(np.float32)
+
+
+def prepare(data, sr, rate=RATE):
+    """Mono, resampled, trimmed and normalised float32 samples at `rate`."""
+    data = resample(to_mono(np.asarray(data, dtype=np.float32)), sr, rate)
+    return normalize(trim_silence(data, rate))
+
+
+def processed_sound(path):
+    """(samples, rate) for a sound file, processed once and cached."""
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        cached = _cache.get(key)
+    if cached is None:
+        data, sr = load_sound(path)
+        cached = (prepare(data, sr), RATE)
+        with _lock:
+            _cache[key] = cached
+    return cached
+
+
+def to_wav_bytes(data, rate=RATE, subtype=SUBTYPE):
+    buf = io.BytesIO()
+    sf.write(buf, data, rate, subtype=subtype, format='WAV')
+    return buf.getvalue()
+
+
+def sprite(paths, rate=RATE, gap=SPRITE_GAP):
+    """(samples, table) for {name: path}; table maps name -> (offset, duration)."""
+    silence = np.zeros(int(rate * gap), dtype=np.float32)
+    parts, table, offset = [], {}, 0
+    for name, path in sorted(paths.items()):
+        data, _ = processed_sound(path)
+        table[name] = (offset / rate, len(data) / rate)
+        parts += [data, silence]
+        offset += len(data) + len(silence)
+    samples = np.concatenate(parts) if parts else silence
+    return samples, table
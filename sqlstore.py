@@ -0,0 +1,313 @@
+"""SQLite storage engine for drumshed.
+
+Same load/save/record API as the JSON store in datastore.py, plus indexed
+queries the JSON file can't answer without a full scan:
+
+    count_records()         row count without loading the table
+    notes_page()            practice_log newest-first via LIMIT/OFFSET
+    goals_by_target_date()  goals already ordered by Target Date
+
+Enable it with DRUMSHED_STORAGE=sqlite and move the existing history over
+once with:
+
+    python sqlstore.py [data.json] [drumshed.db]
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+from schema import new_id, normalize_record
+
+# --- Constants ---
+DB_FILE = os.environ.get("DRUMSHED_DB", "drumshed.db")
+
+# data.json field -> column, per table. Anything else a record carries is
+# kept in the "extra" JSON column so a round trip never drops fields.
+LOG_COLUMNS = {"id": "id", "timestamp": "timestamp", "entry": "entry"}
+GOAL_COLUMNS = {
+    "id": "id",
+    "Goal": "goal",
+    "Target Date": "target_date",
+    "Details": "details",
+    "Status": "status",
+    "Start Date": "start_date",
+}
+TABLES = {"practice_log": LOG_COLUMNS, "goals": GOAL_COLUMNS, "archives": GOAL_COLUMNS}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS practice_log (
+    seq INTEGER PRIMARY KEY,
+    id TEXT,
+    timestamp TEXT,
+    entry TEXT,
+    extra TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS practice_log_id ON practice_log (id);
+CREATE INDEX IF NOT EXISTS practice_log_timestamp ON practice_log (timestamp);
+
+CREATE TABLE IF NOT EXISTS goals (
+    seq INTEGER PRIMARY KEY,
+    id TEXT,
+    goal TEXT,
+    target_date TEXT,
+    details TEXT,
+    status TEXT,
+    start_date TEXT,
+    extra TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS goals_id ON goals (id);
+CREATE INDEX IF NOT EXISTS goals_target_date ON goals (target_date);
+CREATE INDEX IF NOT EXISTS goals_status ON goals (status);
+
+CREATE TABLE IF NOT EXISTS archives (
+    seq INTEGER PRIMARY KEY,
+    id TEXT,
+    goal TEXT,
+    target_date TEXT,
+    details TEXT,
+    status TEXT,
+    start_date TEXT,
+    extra TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS archives_id ON archives (id);
+CREATE INDEX IF NOT EXISTS archives_target_date ON archives (target_date);
+CREATE INDEX IF NOT EXISTS archives_status ON archives (status);
+"""
+
+# Upgrades for databases created by older versions, keyed by the
+# PRAGMA user_version they bring a database up to. A step is an SQL
+# statement or a callable taking the connection.
+MIGRATIONS = {
+    # 1: stable record IDs
+    1: [f"ALTER TABLE {table} ADD COLUMN id TEXT" for table in TABLES],
+    # 2: canonical dates and timestamps (schema.py)
+    2: [lambda conn: _normalize_dates(conn)],
+    # 3: a log entry's timestamp is always a string (schema.FIELDS)
+    3: ["UPDATE practice_log SET timestamp = '' WHERE timestamp IS NULL"],
+}
+SCHEMA_VERSION = max(MIGRATIONS)
+
+# --- Connections and cache ---
+# One connection per database per process; Streamlit sessions run on
+# different threads, so access is serialised with _lock.
+_connections = {}
+_cache = {}
+_versions = {}
+_lock = threading.RLock()
+
+
+def _migrate(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    fresh = conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+    with conn:
+        if not fresh:
+            for target in range(version + 1, SCHEMA_VERSION + 1):
+                for statement in MIGRATIONS[target]:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+        conn.executescript(SCHEMA)
+        for table in TABLES:
+            for (seq,) in conn.execute(f"SELECT seq FROM {table} WHERE id IS NULL").fetchall():
+                conn.execute(f"UPDATE {table} SET id = ? WHERE seq = ?", (new_id(), seq))
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _normalize_dates(conn):
+    for table, columns in TABLES.items():
+        fields = [field for field in columns if field != "id"]
+        for row in conn.execute(f"SELECT * FROM {table}").fetchall():
+            record = {field: row[columns[field]] for field in fields}
+            canonical = normalize_record(table, record)
+            if canonical != record:
+                assignments = ", ".join(f"{columns[field]} = ?" for field in fields)
+                conn.execute(f"UPDATE {table} SET {assignments} WHERE seq = ?",
+                             [canonical[field] for field in fields] + [row["seq"]])
+
+
+def _connect(db_path):
+    conn = _connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        _migrate(conn)
+        _connections[db_path] = conn
+    return conn
+
+
+def _to_row(table, record):
+    columns = TABLES[table]
+    row = {col: record.get(field) for field, col in columns.items()}
+    extra = {k: v for k, v in record.items() if k not in columns}
+    row["extra"] = json.dumps(extra, default=str) if extra else None
+    return row
+
+
+def _to_record(table, row):
+    record = {field: row[col] for field, col in TABLES[table].items()}
+    if row["extra"]:
+        record.update(json.loads(row["extra"]))
+    return record
+
+
+def _cache_key(conn, db_path):
+    # data_version changes whenever another connection commits.
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    return (data_version, _versions.get(db_path, 0))
+
+
+def _insert(conn, table, record):
+    if not record.get("id"):
+        record["id"] = new_id()
+    row = _to_row(table, record)
+    cols = ", ".join(row)
+    marks = ", ".join("?" for _ in row)
+    conn.execute(f"INSERT INTO {table} ({cols}) VALUES ({marks})", list(row.values()))
+
+
+def _touch(conn, db_path):
+    """Keep the cached copy valid after one of our own commits."""
+    cached = _cache.get(db_path)
+    if cached is not None:
+        cached["key"] = _cache_key(conn, db_path)
+
+
+def _remove(records, record):
+    for i in range(len(records) - 1, -1, -1):
+        if records[i] is record:
+            del records[i]
+            return
+
+
+# --- Public API ---
+def load_data(db_path=DB_FILE):
+    with _lock:
+        conn = _connect(db_path)
+        key = _cache_key(conn, db_path)
+        cached = _cache.get(db_path)
+        if cached is not None and cached["key"] == key:
+            return cached["data"]
+
+        data = {}
+        for table in TABLES:
+            rows = conn.execute(f"SELECT * FROM {table} ORDER BY seq")
+            data[table] = [_to_record(table, row) for row in rows]
+        index = {table: {r["id"]: r for r in records} for table, records in data.items()}
+        _cache[db_path] = {"key": key, "data": data, "index": index}
+        return data
+
+
+def save_data(data, db_path=DB_FILE):
+    """Replace every table with the contents of data."""
+    with _lock:
+        conn = _connect(db_path)
+        with conn:
+            for table in TABLES:
+                conn.execute(f"DELETE FROM {table}")
+                for record in data.get(table, []):
+                    _insert(conn, table, record)
+        _versions[db_path] = _versions.get(db_path, 0) + 1
+        index = {table: {r["id"]: r for r in data.get(table, [])} for table in TABLES}
+        _cache[db_path] = {"key": _cache_key(conn, db_path), "data": data, "index": index}
+
+
+def get_record(table, record_id, db_path=DB_FILE):
+    with _lock:
+        load_data(db_path)
+        return _cache[db_path]["index"][table].get(record_id)
+
+
+def append_record(table, record, db_path=DB_FILE):
+    # Round-trip through JSON so the cached copy matches what a fresh load
+    # would give back.
+    record = json.loads(json.dumps(record, default=str))
+    with _lock:
+        data = load_data(db_path)
+        conn = _connect(db_path)
+        with conn:
+            _insert(conn, table, record)
+        data[table].append(record)
+        _cache[db_path]["index"][table][record["id"]] = record
+        _touch(conn, db_path)
+
+
+def update_record(table, record_id, changes, db_path=DB_FILE):
+    changes = json.loads(json.dumps(changes, default=str))
+    with _lock:
+        load_data(db_path)
+        conn = _connect(db_path)
+        record = _cache[db_path]["index"][table].get(record_id)
+        if record is None:
+            return
+        record.update(changes)
+        row = _to_row(table, record)
+        assignments = ", ".join(f"{col} = ?" for col in row)
+        with conn:
+            conn.execute(
+                f"UPDATE {table} SET {assignments} WHERE id = ?",
+                [*row.values(), record_id],
+            )
+        _touch(conn, db_path)
+
+
+def delete_record(table, record_id, db_path=DB_FILE):
+    with _lock:
+        data = load_data(db_path)
+        conn = _connect(db_path)
+        with conn:
+            conn.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
+        record = _cache[db_path]["index"][table].pop(record_id, None)
+        if record is not None:
+            _remove(data[table], record)
+        _touch(conn, db_path)
+
+
+def count_records(table, db_path=DB_FILE):
+    with _lock:
+        conn = _connect(db_path)
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def notes_page(offset=0, limit=None, db_path=DB_FILE):
+    """Newest-first slice of practice_log."""
+    with _lock:
+        conn = _connect(db_path)
+        rows = conn.execute(
+            """
+            SELECT * FROM practice_log
+            ORDER BY timestamp DESC, seq DESC
+            LIMIT ? OFFSET ?
+            """,
+            (-1 if limit is None else limit, offset),
+        )
+        return [_to_record("practice_log", row) for row in rows]
+
+
+def goals_by_target_date(db_path=DB_FILE):
+    """Goals ordered by Target Date."""
+    with _lock:
+        conn = _connect(db_path)
+        rows = conn.execute(
+            "SELECT * FROM goals ORDER BY target_date IS NULL, target_date, seq"
+        )
+        return [_to_record("goals", row) for row in rows]
+
+
+# --- Importer ---
+def import_json(json_path="data.json", db_path=DB_FILE):
+    """One-shot copy of a data.json (plus any pending journal) into SQLite."""
+    from datastore import read_json
+
+    data = read_json(json_path)
+    data.pop("journal_seq", None)
+    save_data(data, db_path)
+    return {table: len(data.get(table, [])) for table in TABLES}
+
+
+if __name__ == "__main__":
+    counts = import_json(*sys.argv[1:3])
+    print(", ".join(f"{n} {table}" for table, n in counts.items()))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import clicktrack
+from rhythm import FEELS
+from soundbank import processed_sound
+
+
+def direct_mix(tempo, feel, bars, end_tempo=None, sound="click.wav"):
+    """Every click mixed in one pass, as the reference for click_stream()."""
+    subdivision = FEELS[feel]
+    sample, rate = processed_sound(f"{clicktrack.SOUNDS_FOLDER}/{sound}")
+    clicks = bars * clicktrack.BEATS_PER_BAR * subdivision
+    iv = clicktrack._intervals(0, clicks, clicks, tempo, end_tempo or tempo, subdivision, rate)
+    onsets = np.round(np.concatenate(([0.0], np.cumsum(iv[:-1])))).astype(np.int64)
+    frames = clicktrack.stream_frames(tempo, feel, bars, end_tempo, sound)
+    gains = clicktrack.click_gains(bars, subdivision, clicktrack.ACCENTS["Downbeat"])
+    return np.clip(clicktrack.mix(frames, onsets, gains, sample), -1.0, 1.0)
+
+
+@pytest.mark.parametrize("tempo, feel, bars, end_tempo", [
+    (120, "1/4", 2, None),
+    (200, "1/16", 1, None),
+    (110, "1/16", 5, 200),
+    (180, "1/8", 3, 60),
+])
+@pytest.mark.parametrize("block", [1000, 10000, clicktrack.BLOCK_FRAMES])
+def test_stream_matches_direct_mix(tempo, feel, bars, end_tempo, block):
+    streamed = np.concatenate(list(clicktrack.click_stream(tempo, feel, bars, end_tempo=end_tempo, block=block)))
+    expected = direct_mix(tempo, feel, bars, end_tempo)
+    assert len(streamed) == len(expected)
+    np.testing.assert_allclose(streamed, expected, atol=1e-5)
+
+
+
+# the last case is shorter than its sample, so the tail wraps more than once
+@pytest.mark.parametrize("tempo, feel, bars, beats_per_bar, sound", [
+    (120, "1/4", 2, 4, "click.wav"),
+    (200, "1/16", 1, 4, "808.wav"),
+    (97, "1/8", 3, 4, "clap-lo.wav"),
+    (200, "1/4", 1, 1, "808.wav"),
+])
+@pytest.mark.parametrize("block", [1000, 10000, clicktrack.BLOCK_FRAMES])
+def test_loop_stream_matches_render(tempo, feel, bars, beats_per_bar, sound, block):
+    streamed = np.concatenate(list(clicktrack.click_stream(
+        tempo, feel, bars, sound=sound, beats_per_bar=beats_per_bar, block=block, loop=True)))
+    expected = clicktrack.render_click_track(tempo, feel, bars, sound=sound, beats_per_bar=beats_per_bar)
+    np.testing.assert_allclose(streamed, expected, atol=1e-5)
@@ -0,0 +1,103 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import datastore
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORAGE_MODE", "journal")
+    path = str(tmp_path / "data.json")
+    datastore.save_data(datastore.empty_data(), path)
+    return path
+
+
+def reload(path):
+    datastore.invalidate(path)
+    return datastore.load_data(path)
+
+
+def entries(data):
+    return [record["entry"] for record in data["practice_log"]]
+
+
+def journal_lines(path):
+    with open(datastore._journal_path(path)) as f:
+        return f.read().splitlines()
+
+
+def test_journal_replays_on_top_of_snapshot(journal):
+    kept = datastore.append_record("practice_log", {"entry": "kept"}, journal)
+    gone = datastore.append_record("practice_log", {"entry": "gone"}, journal)
+    datastore.update_record("practice_log", kept, {"entry": "edited"}, journal)
+    datastore.delete_record("practice_log", gone, journal)
+
+    with open(journal) as f:
+        assert json.load(f)["practice_log"] == []
+    assert len(journal_lines(journal)) == 4
+    assert entries(reload(journal)) == ["edited"]
+    assert entries(datastore.read_json(journal)) == ["edited"]
+
+
+def test_torn_last_line_is_cut_off(journal):
+    datastore.append_record("practice_log", {"entry": "one"}, journal)
+    with open(datastore._journal_path(journal), "a") as f:
+        f.write('{"op": "append", "tab')
+
+    assert entries(reload(journal)) == ["one"]
+    assert len(journal_lines(journal)) == 1
+    datastore.append_record("practice_log", {"entry": "two"}, journal)
+    assert entries(reload(journal)) == ["one", "two"]
+
+
+@pytest.mark.skipif(datastore.fcntl is None, reason="needs flock")
+def test_append_in_flight_is_not_truncated(journal):
+    datastore.append_record("practice_log", {"entry": "one"}, journal)
+    op = {"op": "append", "table": "practice_log", "seq": 2,
+          "record": {"id": "two", "timestamp": "", "entry": "two"}}
+    line = json.dumps(op) + "\n"
+    # another writer, halfway through its append while holding the lock
+    writer = open(datastore._journal_path(journal), "a")
+    datastore.fcntl.flock(writer, datastore.fcntl.LOCK_EX)
+    writer.write(line[:20])
+    writer.flush()
+
+    loaded = {}
+    reader = threading.Thread(target=lambda: loaded.update(data=reload(journal)))
+    reader.start()
+    time.sleep(0.2)
+    writer.write(line[20:])
+    writer.flush()
+    datastore.fcntl.flock(writer, datastore.fcntl.LOCK_UN)
+    writer.close()
+    reader.join()
+
+    assert entries(loaded["data"]) == ["one", "two"]
+    assert len(journal_lines(journal)) == 2
+
+
+def test_compact_folds_journal_into_snapshot(journal):
+    datastore.append_record("practice_log", {"entry": "one"}, journal)
+    datastore.append_record("practice_log", {"entry": "two"}, journal)
+    datastore.compact(journal)
+
+    assert os.path.getsize(datastore._journal_path(journal)) == 0
+    with open(journal) as f:
+        snapshot = json.load(f)
+    assert entries(snapshot) == ["one", "two"]
+    assert snapshot["journal_seq"] == 2
+    datastore.append_record("practice_log", {"entry": "three"}, journal)
+    assert entries(reload(journal)) == ["one", "two", "three"]
+
+
+def test_journal_compacts_past_threshold(journal, monkeypatch):
+    monkeypatch.setattr(datastore, "JOURNAL_COMPACT_BYTES", 300)
+    for i in range(10):
+        datastore.append_record("practice_log", {"entry": f"note {i}"}, journal)
+
+    assert os.path.getsize(datastore._journal_path(journal)) <= 300
+    assert entries(reload(journal)) == [f"note {i}" for i in range(10)]
@@ -0,0 +1,60 @@
+from datetime import date
+
+import pytest
+
+import datastore
+import goalview
+
+
+@pytest.fixture(params=["json", "journal"])
+def store(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORAGE_MODE", request.param)
+    path = str(tmp_path / "data.json")
+    datastore.save_data(datastore.empty_data(), path)
+    builds = []
+    build = goalview._build
+    monkeypatch.setattr(goalview, "_build", lambda *args: builds.append(1) or build(*args))
+    return path, builds
+
+
+def add(path, goal, due):
+    return datastore.append_record("goals", {"Goal": goal, "Target Date": due}, path)
+
+
+def assert_sorted(path):
+    rows = goalview.goal_view(path)
+    dues = [row["due"] for row in rows]
+    assert dues == sorted(dues, key=lambda due: (due is None, due or date.max))
+    assert [row["record"] for row in rows] == sorted(
+        datastore.load_data(path)["goals"], key=lambda g: (g["Target Date"] is None, g["Target Date"] or ""))
+    return [row["record"]["Goal"] for row in rows]
+
+
+def test_goal_view_follows_changes(store):
+    path, builds = store
+    add(path, "march", "2026-03-01")
+    add(path, "someday", None)
+    jan = add(path, "january", "2026-01-01")
+    assert assert_sorted(path) == ["january", "march", "someday"]
+
+    add(path, "february", "2026-02-01")
+    assert assert_sorted(path) == ["january", "february", "march", "someday"]
+    datastore.update_record("goals", jan, {"Target Date": "2026-12-31"}, path)
+    assert assert_sorted(path) == ["february", "march", "january", "someday"]
+    datastore.update_record("goals", jan, {"Status": "Practicing"}, path)
+    assert goalview.goal_view(path)[2]["record"]["Status"] == "Practicing"
+    datastore.delete_record("goals", jan, path)
+    assert assert_sorted(path) == ["february", "march", "someday"]
+    assert len(builds) == 1
+
+
+def test_save_data_rebuilds(store):
+    path, builds = store
+    add(path, "one", "2026-01-01")
+    goalview.goal_view(path)
+    data = datastore.load_data(path)
+    data["goals"].append({"Goal": "raw", "Target Date": "2025-01-01"})
+    datastore.save_data(data, path)
+
+    assert assert_sorted(path) == ["raw", "one"]
+    assert len(builds) == 2
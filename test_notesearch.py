@@ -0,0 +1,87 @@
+import pytest
+
+import datastore
+import notesearch
+
+
+@pytest.fixture(params=["json", "journal"])
+def store(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORAGE_MODE", request.param)
+    path = str(tmp_path / "data.json")
+    datastore.save_data(datastore.empty_data(), path)
+    builds = []
+    build = notesearch._build
+    monkeypatch.setattr(notesearch, "_build", lambda data: builds.append(1) or build(data))
+    return path, builds
+
+
+def note(path, entry, timestamp):
+    return datastore.append_record("practice_log", {"entry": entry, "timestamp": timestamp}, path)
+
+
+@pytest.fixture
+def notes(store):
+    path, _ = store
+    return {
+        "rudiment": note(path, "Paradiddle practice", "2026-01-01 10:00:00"),
+        "tune": note(path, "Jazz tune with paradiddles", "2026-01-02 10:00:00"),
+        "comping": note(path, "Jazz comping", "2026-01-03 10:00:00"),
+    }
+
+
+def test_prefix_matches(store, notes):
+    path, _ = store
+    assert set(notesearch.search("parad", path=path)) == {notes["rudiment"], notes["tune"]}
+    assert notesearch.search("PARAD", path=path) == notesearch.search("parad", path=path)
+
+
+def test_every_word_must_match(store, notes):
+    path, _ = store
+    assert notesearch.search("parad jazz", path=path) == [notes["tune"]]
+    assert notesearch.search("jazz swing", path=path) == []
+
+
+def test_exact_word_outranks_prefix(store, notes):
+    path, _ = store
+    assert notesearch.search("paradiddle", path=path) == [notes["rudiment"], notes["tune"]]
+
+
+def test_ties_go_newest_first(store, notes):
+    path, _ = store
+    assert notesearch.search("jazz", path=path) == [notes["comping"], notes["tune"]]
+    assert notesearch.search("jazz", limit=1, path=path) == [notes["comping"]]
+
+
+def test_short_words_match_whole_words_only(store, notes):
+    path, _ = store
+    note(path, "a j b", "2026-01-04 10:00:00")
+    assert len(notesearch.search("j", path=path)) == 1
+    assert notesearch.search("co", path=path) == [notes["comping"]]
+    assert notesearch.search("!!", path=path) == []
+
+
+def test_index_follows_changes(store, notes):
+    path, builds = store
+    assert notesearch.search("ghost", path=path) == []
+
+    ghost = note(path, "Ghost notes on the snare", "2026-01-05 10:00:00")
+    assert notesearch.search("ghost", path=path) == [ghost]
+    datastore.update_record("practice_log", notes["comping"], {"entry": "Ghost note comping"}, path)
+    assert notesearch.search("ghost", path=path) == [ghost, notes["comping"]]
+    assert notesearch.search("jazz", path=path) == [notes["tune"]]
+    datastore.delete_record("practice_log", ghost, path)
+    assert notesearch.search("ghost", path=path) == [notes["comping"]]
+    assert notesearch.search("snare", path=path) == []
+    assert "snare" not in notesearch._index(path)["vocab"]
+    assert len(builds) == 1
+
+
+def test_save_data_rebuilds(store, notes):
+    path, builds = store
+    notesearch.search("jazz", path=path)
+    data = datastore.load_data(path)
+    data["practice_log"] = [r for r in data["practice_log"] if r["id"] != notes["tune"]]
+    datastore.save_data(data, path)
+
+    assert notesearch.search("jazz", path=path) == [notes["comping"]]
+    assert len(builds) == 2
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+
+import pytest
+
+import datastore
+import schema
+import sqlstore
+
+OLD_DOCUMENT = {
+    "practice_log": [
+        {"timestamp": "2025-07-26 11:21:25.933992", "entry": "kill the wabbit"},
+        {"entry": "no timestamp"},
+    ],
+    "goals": [{"Goal": "Paradiddles at 120", "Target Date": "2025-08-08 00:00:00", "Details": ""}],
+}
+
+
+@pytest.fixture
+def old_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "STORAGE_MODE", "json")
+    path = str(tmp_path / "data.json")
+    with open(path, "w") as f:
+        json.dump(OLD_DOCUMENT, f)
+    return path
+
+
+def test_old_document_is_migrated_once(old_file, monkeypatch):
+    data = datastore.load_data(old_file)
+
+    assert data["schema_version"] == schema.SCHEMA_VERSION
+    assert [r["timestamp"] for r in data["practice_log"]] == ["2025-07-26T11:21:25", ""]
+    assert data["goals"][0]["Target Date"] == "2025-08-08"
+    assert data["goals"][0]["Status"] == "New"
+    assert data["archives"] == []
+    assert all(r["id"] for table in schema.TABLES for r in data[table])
+    with open(old_file) as f:
+        assert json.load(f) == data
+
+    saves = []
+    monkeypatch.setattr(datastore, "_save", lambda *args: saves.append(args))
+    datastore.invalidate(old_file)
+    assert datastore.load_data(old_file) == data
+    assert saves == []
+
+
+def test_migrate_runs_only_missing_steps(monkeypatch):
+    ran = []
+    steps = {target: (lambda data, target=target: ran.append(target)) for target in schema.MIGRATIONS}
+    monkeypatch.setattr(schema, "MIGRATIONS", steps)
+
+    data = {"schema_version": 2}
+    assert schema.migrate(data)
+    assert ran == list(range(3, schema.SCHEMA_VERSION + 1))
+    assert data["schema_version"] == schema.SCHEMA_VERSION
+    assert not schema.migrate(data)
+    assert ran == list(range(3, schema.SCHEMA_VERSION + 1))
+
+
+def test_version_3_null_timestamps_are_blanked():
+    data = {"schema_version": 3, "practice_log": [{"id": "a", "timestamp": None, "entry": ""}],
+            "goals": [], "archives": []}
+    assert schema.migrate(data)
+    assert data["practice_log"][0]["timestamp"] == ""
+
+
+def test_old_sqlite_database_is_upgraded(tmp_path):
+    db = str(tmp_path / "drumshed.db")
+    conn = sqlite3.connect(db)
+    # the tables as the first SQLite engine created them: no id column
+    conn.executescript("""
+        CREATE TABLE practice_log (seq INTEGER PRIMARY KEY, timestamp TEXT, entry TEXT, extra TEXT);
+        CREATE TABLE goals (seq INTEGER PRIMARY KEY, goal TEXT, target_date TEXT, details TEXT,
+                            status TEXT, start_date TEXT, extra TEXT);
+        CREATE TABLE archives (seq INTEGER PRIMARY KEY, goal TEXT, target_date TEXT, details TEXT,
+                               status TEXT, start_date TEXT, extra TEXT);
+        INSERT INTO practice_log (timestamp, entry) VALUES ('2025-07-30 18:55:24', 'a'), (NULL, 'b');
+        INSERT INTO goals (goal, target_date, status) VALUES ('g', '2025-08-08 00:00:00', 'New');
+    """)
+    conn.commit()
+    conn.close()
+
+    data = sqlstore.load_data(db)
+
+    assert [r["timestamp"] for r in data["practice_log"]] == ["2025-07-30T18:55:24", ""]
+    assert data["goals"][0]["Target Date"] == "2025-08-08"
+    assert all(r["id"] for table in sqlstore.TABLES for r in data[table])
+    conn = sqlite3.connect(db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == sqlstore.SCHEMA_VERSION
+    conn.close()